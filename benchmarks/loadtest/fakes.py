@@ -0,0 +1,506 @@
+"""
+Локальные заменители внешних зависимостей для нагрузочного стенда:
+t.me и CDN, API emily-database-handler, приемник Loki, новостные сайты и Redis в памяти.
+"""
+import fnmatch
+import io
+import json
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+WORDS = ("москва новости происшествие улица движение власти жители район сегодня вечером утром "
+         "сообщили данные полиция транспорт погода город области заявили центр работы проект").split()
+
+
+def synthetic_text(seed: int, words: int = 60) -> str:
+    rnd = random.Random(seed)
+    return " ".join(rnd.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def synthetic_media(size: int, kind: str) -> bytes:
+    """
+    Генерирует файл заданного размера. Изображения - настоящий JPEG (если есть Pillow), чтобы работала их обработка.
+    """
+    if kind == "img":
+        try:
+            from PIL import Image
+
+            side = max(64, int((size / 3) ** 0.5))
+            image = Image.effect_noise((side, side), 64).convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=95)
+            return buffer.getvalue()
+        except ImportError:
+            pass
+    return random.Random(size).randbytes(size)
+
+
+class ServerThread:
+    def __init__(self, handler_class, **attributes):
+        """
+        HTTP-сервер в фоновом потоке на свободном порту 127.0.0.1.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.server.daemon_threads = True
+        for name, value in attributes.items():
+            setattr(self.server, name, value)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> "ServerThread":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body: bytes, content_type: str, status: int = 200, send_body: bool = True):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+
+class ChannelFeed:
+    def __init__(self, channels: int, posts_per_hour: float, backlog: int, started_at: float, seed: int = 1):
+        """
+        Расписание публикаций синтетических каналов: у каждого канала backlog старых постов
+        и новые посты с заданной частотой, сдвинутые на случайную фазу.
+        """
+        rnd = random.Random(seed)
+        self.names = [f"channel{i:05d}" for i in range(channels)]
+        self.interval = 3600 / posts_per_hour
+        self.backlog = backlog
+        self.started_at = started_at
+        self.phase = {name: rnd.random() * self.interval for name in self.names}
+
+    def published_at(self, channel: str, post_id: int) -> float:
+        if post_id <= self.backlog:
+            return self.started_at - (self.backlog - post_id + 1) * self.interval
+        return self.started_at + self.phase[channel] + (post_id - self.backlog - 1) * self.interval
+
+    def latest_id(self, channel: str, now: float) -> int:
+        elapsed = now - self.started_at - self.phase[channel]
+        return self.backlog + (int(elapsed // self.interval) + 1 if elapsed >= 0 else 0)
+
+
+class TelegramHandler(QuietHandler):
+    def _post_html(self, channel: str, post_id: int) -> str:
+        server = self.server
+        media = []
+        if server.image_bytes:
+            media.append(f"""<a class="tgme_widget_message_photo_wrap"
+                style="background-image:url('{server.base_url}/cdn/img/{channel}-{post_id}.jpg')"></a>""")
+        if server.video_ratio and random.Random(post_id).random() < server.video_ratio:
+            media.append(f"""<div class="tgme_widget_message_video_wrap">
+                <i class="tgme_widget_message_video_thumb"
+                   style="background-image:url('{server.base_url}/cdn/thumb/{channel}-{post_id}.jpg')"></i>
+                <video src="{server.base_url}/cdn/vid/{channel}-{post_id}.mp4"></video></div>""")
+        published = time.strftime("%Y-%m-%dT%H:%M:%S+00:00",
+                                   time.gmtime(server.feed.published_at(channel, post_id)))
+        return f"""<div class="tgme_widget_message" data-post="{channel}/{post_id}">
+            <div class="tgme_widget_message_author accent_color"><a class="tgme_widget_message_owner_name">
+            <span dir="auto">{channel}</span></a></div>
+            {''.join(media)}
+            <div class="tgme_widget_message_text js-message_text" dir="auto">
+            {synthetic_text(hash((channel, post_id)))} <a href="https://example.com/{channel}/{post_id}?utm_source=tg">ссылка</a>
+            </div>
+            <div class="tgme_widget_message_footer"><span class="tgme_widget_message_meta">
+            <a class="tgme_widget_message_date" href="https://t.me/{channel}/{post_id}">
+            <time datetime="{published}" class="datetime">{published}</time></a></span></div></div>"""
+
+    def _handle(self, send_body: bool):
+        path = urlparse(self.path).path
+        parts = path.strip("/").split("/")
+        server = self.server
+        server.requests[parts[0]] += 1
+
+        if parts[0] == "s" and len(parts) == 2 and parts[1] in server.feed.phase:
+            latest = server.feed.latest_id(parts[1], time.time())
+            posts = "".join(self._post_html(parts[1], post_id)
+                            for post_id in range(max(1, latest - server.page_size + 1), latest + 1))
+            return self.send_body(f"<html><body>{posts}</body></html>".encode(), "text/html; charset=utf-8",
+                                  send_body=send_body)
+        if parts[0] == "s" and len(parts) == 3 and parts[1] in server.feed.phase:
+            body = f"<html><body>{self._post_html(parts[1], int(parts[2]))}</body></html>".encode()
+            return self.send_body(body, "text/html; charset=utf-8", send_body=send_body)
+        if parts[0] == "cdn" and len(parts) == 3:
+            kind = "vid" if parts[1] == "vid" else "img"
+            body = server.video_body if kind == "vid" else server.image_body
+            return self.send_body(body, "video/mp4" if kind == "vid" else "image/jpeg", send_body=send_body)
+        self.send_body(b"not found", "text/plain", status=404, send_body=send_body)
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+
+class FakeTelegram(ServerThread):
+    def __init__(self, feed: ChannelFeed, image_bytes: int, video_bytes: int, video_ratio: float, page_size: int = 20):
+        """
+        Синтетический t.me: страницы каналов /s/<канал>, страницы постов и CDN с медиа заданного размера.
+        """
+        super().__init__(
+            TelegramHandler,
+            feed=feed,
+            page_size=page_size,
+            image_bytes=image_bytes,
+            video_ratio=video_ratio,
+            image_body=synthetic_media(image_bytes, "img") if image_bytes else b"",
+            video_body=synthetic_media(video_bytes, "vid") if video_bytes else b"",
+            requests=defaultdict(int),
+        )
+        self.server.base_url = self.url
+
+
+class ApiHandler(QuietHandler):
+    def _delay(self) -> bool:
+        latency, jitter = self.server.latency, self.server.jitter
+        if latency or jitter:
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        if self.server.failing:
+            self.read_body()
+            self.send_body(b'{"detail": "unavailable"}', "application/json", status=503)
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._delay():
+            return
+        parts = urlparse(self.path).path.strip("/").split("/")
+        self.server.calls["exists"] += 1
+        if parts[:2] == ["all-news", "exists-news"] and len(parts) == 4:
+            exists = (parts[2], int(parts[3])) in self.server.news
+            return self.send_body(json.dumps({"exists": exists}).encode(), "application/json")
+        self.send_body(b"{}", "application/json", status=404)
+
+    def do_POST(self):
+        if not self._delay():
+            return
+        parts = urlparse(self.path).path.strip("/").split("/")
+        body = self.read_body()
+        if parts == ["all-news", "create"]:
+            self.server.calls["create"] += 1
+            data = json.loads(body)
+            self.server.news.add((data["channel"], int(data["id_post"])))
+            return self.send_body(b"{}", "application/json")
+        if parts[0] == "media" and parts[1] == "upload":
+            self.server.calls["upload"] += 1
+            self.server.upload_bytes += len(body)
+            return self.send_body(b'{"status": "ok"}', "application/json")
+        self.send_body(b"{}", "application/json", status=404)
+
+
+class FakeApi(ServerThread):
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, existing=()):
+        """
+        Заменитель emily-database-handler: all-news/exists-news, all-news/create и media/upload
+        с настраиваемой задержкой ответа. Пока failing=True, все запросы получают 503.
+        """
+        super().__init__(ApiHandler, latency=latency, jitter=jitter, failing=False, news=set(existing),
+                         calls=defaultdict(int), upload_bytes=0)
+
+
+class LokiHandler(QuietHandler):
+    def do_POST(self):
+        self.read_body()
+        self.server.records += 1
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class LokiSink(ServerThread):
+    def __init__(self):
+        """
+        Приемник Loki: принимает и считает записи.
+        """
+        super().__init__(LokiHandler, records=0)
+
+
+class SiteHandler(QuietHandler):
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        server = self.server
+        if len(parts) == 3 and parts[0] == "site" and parts[2] == "rss":
+            latest = int((time.time() - server.started_at) // server.interval)
+            link = f"{server.base_url}/site/{parts[1]}/article-{latest}"
+            rss = f"""<?xml version="1.0"?><rss version="2.0"><channel><title>site {parts[1]}</title>
+                <item><title>Статья {latest}</title><link>{link}</link></item></channel></rss>"""
+            return self.send_body(rss.encode(), "application/rss+xml; charset=utf-8")
+        if len(parts) == 3 and parts[0] == "site":
+            paragraphs = "".join(f"<p>{synthetic_text(hash((parts[1], parts[2], i)), 40)}</p>" for i in range(6))
+            html = f"""<html><head><title>{parts[2]}</title>
+                <meta property="og:image" content="{server.telegram_url}/cdn/img/{parts[1]}-{parts[2]}.jpg">
+                </head><body><article><h1>Статья {parts[2]}</h1>{paragraphs}</article></body></html>"""
+            return self.send_body(html.encode(), "text/html; charset=utf-8")
+        self.send_body(b"not found", "text/plain", status=404)
+
+
+class FakeSites(ServerThread):
+    def __init__(self, sites: int, articles_per_hour: float, telegram_url: str):
+        """
+        Новостные сайты с RSS: /site/<n>/rss указывает на последнюю статью /site/<n>/article-<k>.
+        """
+        super().__init__(SiteHandler, started_at=time.time(), interval=3600 / articles_per_hour,
+                         telegram_url=telegram_url)
+        self.server.base_url = self.url
+        self.sites = sites
+
+    def sources(self) -> list[dict]:
+        return [{"name": f"{self.url}/site/{i}", "type": "site", "rss": f"{self.url}/site/{i}/rss"}
+                for i in range(self.sites)]
+
+
+class InMemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+
+        def queue_call(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+        return queue_call
+
+    def execute(self):
+        calls, self.calls = self.calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+def _score_bound(value, default: float) -> tuple[float, bool]:
+    if isinstance(value, bytes):
+        value = value.decode()
+    if isinstance(value, str):
+        if value.startswith("("):
+            return float(value[1:]), True
+        if value in ("-inf", "+inf", "inf"):
+            return float(value), False
+    return float(value) if value is not None else default, False
+
+
+class InMemoryRedis:
+    def __init__(self):
+        """
+        Redis в памяти процесса с подмножеством команд, которые использует сервис:
+        списки, sorted set, хеши, строки с TTL и стримы. Lua-скрипты не поддерживаются,
+        поэтому ограничитель частоты работает на локальных корзинах.
+        """
+        self._lock = threading.RLock()
+        self._data: dict[str, object] = {}
+        self._expires: dict[str, float] = {}
+        self._stream_seq = 0
+        self.push_listeners = []
+
+    @staticmethod
+    def _key(key) -> str:
+        return key.decode() if isinstance(key, bytes) else key
+
+    @staticmethod
+    def _value(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _get(self, key, factory=None):
+        key = self._key(key)
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        if key not in self._data and factory is not None:
+            self._data[key] = factory()
+        return self._data.get(key)
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+    def register_script(self, script):
+        def run(*args, **kwargs):
+            raise NotImplementedError("Lua-скрипты не поддерживаются InMemoryRedis")
+        return run
+
+    # Строки и ключи
+    def set(self, key, value, px=None, ex=None):
+        with self._lock:
+            key = self._key(key)
+            self._data[key] = self._value(value)
+            self._expires.pop(key, None)
+            if px is not None or ex is not None:
+                self._expires[key] = time.time() + (px / 1000 if px is not None else ex)
+            return True
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(self._key(key), None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if self._get(key) is None:
+                return False
+            self._expires[self._key(key)] = time.time() + seconds
+            return True
+
+    def keys(self, pattern="*"):
+        with self._lock:
+            return [key.encode() for key in list(self._data) if fnmatch.fnmatch(key, pattern) and self._get(key)]
+
+    # Списки
+    def rpush(self, key, *values):
+        with self._lock:
+            items = self._get(key, deque)
+            items.extend(self._value(value) for value in values)
+            length = len(items)
+        for listener in self.push_listeners:
+            listener(self._key(key), values)
+        return length
+
+    def lpop(self, key):
+        with self._lock:
+            items = self._get(key)
+            return items.popleft() if items else None
+
+    def blpop(self, keys, timeout=0):
+        keys = [keys] if isinstance(keys, (str, bytes)) else keys
+        deadline = time.time() + (timeout or 0)
+        while True:
+            for key in keys:
+                value = self.lpop(key)
+                if value is not None:
+                    return self._key(key).encode(), value
+            if timeout and time.time() >= deadline:
+                return None
+            time.sleep(0.01)
+
+    def llen(self, key):
+        with self._lock:
+            items = self._get(key)
+            return len(items) if items else 0
+
+    # Sorted set
+    def zadd(self, key, mapping):
+        with self._lock:
+            zset = self._get(key, dict)
+            added = sum(self._value(member) not in zset for member in mapping)
+            zset.update({self._value(member): float(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, key, *members):
+        with self._lock:
+            zset = self._get(key) or {}
+            return sum(zset.pop(self._value(member), None) is not None for member in members)
+
+    def _zrange(self, key, min, max):
+        low, low_open = _score_bound(min, float("-inf"))
+        high, high_open = _score_bound(max, float("inf"))
+        zset = self._get(key) or {}
+        return sorted(
+            ((member, score) for member, score in zset.items()
+             if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)),
+            key=lambda item: (item[1], item[0])
+        )
+
+    def zrangebyscore(self, key, min, max, withscores=False):
+        with self._lock:
+            items = self._zrange(key, min, max)
+            return items if withscores else [member for member, _ in items]
+
+    def zremrangebyscore(self, key, min, max):
+        with self._lock:
+            zset = self._get(key) or {}
+            removed = self._zrange(key, min, max)
+            for member, _ in removed:
+                del zset[member]
+            return len(removed)
+
+    # Хеши
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._lock:
+            hash_ = self._get(key, dict)
+            items = dict(mapping or {})
+            if field is not None:
+                items[field] = value
+            for name, item in items.items():
+                hash_[self._value(name)] = self._value(item)
+            return len(items)
+
+    def hget(self, key, field):
+        with self._lock:
+            return (self._get(key) or {}).get(self._value(field))
+
+    def hmget(self, key, fields):
+        with self._lock:
+            hash_ = self._get(key) or {}
+            return [hash_.get(self._value(field)) for field in fields]
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._get(key) or {})
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            hash_ = self._get(key) or {}
+            return sum(hash_.pop(self._value(field), None) is not None for field in fields)
+
+    # Стримы
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        with self._lock:
+            stream = self._get(key, list)
+            self._stream_seq += 1
+            entry_id = f"{int(time.time() * 1000)}-{self._stream_seq}".encode()
+            stream.append((entry_id, {self._value(name): self._value(value) for name, value in fields.items()}))
+            if maxlen is not None and len(stream) > maxlen:
+                del stream[:len(stream) - maxlen]
+            return entry_id
+
+    @staticmethod
+    def _stream_id(value) -> tuple[int, int]:
+        value = value.decode() if isinstance(value, bytes) else value
+        milliseconds, _, sequence = value.partition("-")
+        return int(milliseconds), int(sequence or 0)
+
+    def xrange(self, key, min="-", max="+", count=None):
+        with self._lock:
+            entries = list(self._get(key) or [])
+        if min not in ("-", b"-"):
+            exclusive = str(min).startswith("(")
+            bound = self._stream_id(str(min).lstrip("("))
+            entries = [entry for entry in entries
+                       if (self._stream_id(entry[0]) > bound if exclusive else self._stream_id(entry[0]) >= bound)]
+        return entries[:count] if count else entries
+
+    def xrevrange(self, key, max="+", min="-", count=None):
+        entries = list(reversed(self.xrange(key)))
+        return entries[:count] if count else entries
+
+    def xlen(self, key):
+        with self._lock:
+            return len(self._get(key) or [])
@@ -0,0 +1,240 @@
+"""
+Нагрузочный стенд: прогоняет полный цикл сбора (страницы каналов, посты, медиа, outbox, API, очередь filter)
+против локальных заменителей внешних сервисов и измеряет пропускную способность и задержку
+на 10, 100, 1000 и 10000 каналов.
+
+    python -m benchmarks.loadtest.run
+    python -m benchmarks.loadtest.run --channels 10,100 --duration 30 --api-latency 0.05
+    python -m benchmarks.loadtest.run --single 1000 --duration 120
+
+Каждый масштаб запускается в отдельном процессе (чистые кеши, честный учет памяти),
+итоги печатаются таблицей. Задержка - время от публикации поста до его появления в очереди filter.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RESULT_PREFIX = "LOADTEST_RESULT "
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def configure_environment(args, telegram, api, loki, workdir: str) -> None:
+    """
+    Направляет сервис на заменители. Вызывается до импорта main: настройки читаются при импорте src.conf.
+    """
+    os.environ.update({
+        "TELEGRAM_FETCHER": "web",
+        "TELEGRAM_BASE_URL": telegram.url,
+        "EMILY_DATABASE_HANDLER_URL": api.url,
+        "LOKI_URL": loki.url,
+        "DEDUP_BACKEND": "memory",
+        "RATE_LIMIT_DEFAULT_RPS": str(args.rps),
+        "RATE_LIMIT_DEFAULT_BURST": str(max(1, int(args.rps))),
+        "OUTBOX_PATH": os.path.join(workdir, "data", "outbox.sqlite3"),
+        "HTTP_CACHE_DIR": os.path.join(workdir, "data", "http_cache"),
+        "SOURCES_PATH": os.path.join(workdir, "sources.json"),
+        "IMAGE_PROCESSING": "1" if args.image_processing else "0",
+        "HTTP_CACHE_TTL_CHANNEL": str(args.channel_ttl),
+    })
+
+
+def run_single(args) -> dict:
+    from benchmarks.loadtest.fakes import ChannelFeed, FakeTelegram, FakeApi, LokiSink, FakeSites, InMemoryRedis
+
+    started_at = time.time()
+    feed = ChannelFeed(args.single, args.posts_per_hour, args.backlog, started_at)
+    telegram = FakeTelegram(feed, args.image_bytes, args.video_bytes, args.video_ratio).start()
+    existing = [(name, post_id) for name in feed.names for post_id in range(1, args.backlog + 1)]
+    api = FakeApi(latency=args.api_latency, jitter=args.api_jitter, existing=existing).start()
+    loki = LokiSink().start()
+    sites = FakeSites(args.sites, args.posts_per_hour, telegram.url).start()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    configure_environment(args, telegram, api, loki, workdir)
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    with open("sources.json", "w") as f:
+        json.dump({"sources": [{"name": name, "type": "telegram"} for name in feed.names] + sites.sources()}, f)
+
+    from src import service
+    from src.logger import logger
+    from src.registry.SourceRegistry import Source
+
+    logger.setLevel(args.log_level)
+    redis = InMemoryRedis()
+    service.set_redis_connection(redis)
+
+    latencies: list[float] = []
+    enqueued = {"telegram": 0, "site": 0}
+
+    def on_push(key, values):
+        if key != service.redis.queue_name:
+            return
+        now = time.time()
+        for value in values:
+            item = service.redis.codec.decode(value)
+            if item["channel"] in feed.phase:
+                enqueued["telegram"] += 1
+                latencies.append(now - feed.published_at(item["channel"], int(item["id_post"])))
+            else:
+                enqueued["site"] += 1
+
+    redis.push_listeners.append(on_push)
+
+    # Потребитель очереди filter, чтобы глубина очереди отражала реальную работу, а не накопление
+    stop = threading.Event()
+
+    def consume():
+        while not stop.is_set():
+            service.redis.receive_from_queue(block=True, timeout=1)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    if not args.no_consumer:
+        consumer.start()
+
+    import main
+
+    channels = [Source(name, "telegram", media_policy=args.media_policy) for name in feed.names]
+    site_sources = [Source(site["name"], "site", rss=site["rss"], media_policy=args.media_policy)
+                    for site in sites.sources()]
+    deadline = started_at + args.duration
+    passes = 0
+    cpu_before = time.process_time()
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        while time.time() < deadline:
+            pass_started = time.time()
+            for i in range(0, len(channels), args.chunk):
+                main.get_telegram_news(channels[i:i + args.chunk])
+                if time.time() >= deadline:
+                    break
+            if site_sources and time.time() < deadline:
+                main.pars_site_news(site_sources)
+            passes += 1
+            time.sleep(max(0.0, min(pass_started + args.pass_interval, deadline) - time.time()))
+    elapsed = time.time() - started_at
+    stop.set()
+    service.image_processor.shutdown()
+
+    usage, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    published = sum(max(0, feed.latest_id(name, deadline) - args.backlog) for name in feed.names)
+    result = {
+        "channels": args.single,
+        "elapsed": round(elapsed, 1),
+        "passes": passes,
+        "published": published,
+        "enqueued": enqueued["telegram"],
+        "site_enqueued": enqueued["site"],
+        "posts_per_sec": round(enqueued["telegram"] / elapsed, 2),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "cpu_sec": round(time.process_time() - cpu_before, 1),
+        "cpu_children_sec": round(children.ru_utime + children.ru_stime, 1),
+        "max_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "telegram_requests": dict(telegram.server.requests),
+        "api_calls": dict(api.server.calls),
+        "upload_mb": round(api.server.upload_bytes / 2 ** 20, 1),
+        "loki_records": loki.server.records,
+        "queue_depth": service.redis.depth(),
+    }
+    for name in ("latency_p50", "latency_p95", "latency_p99"):
+        if result[name] is not None:
+            result[name] = round(result[name], 2)
+
+    for server in (telegram, api, loki, sites):
+        server.stop()
+    os.chdir(ROOT)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def print_table(results: list[dict]) -> None:
+    columns = ("channels", "published", "enqueued", "posts_per_sec", "latency_p50", "latency_p95", "latency_p99",
+               "cpu_sec", "cpu_children_sec", "max_rss_mb", "upload_mb", "loki_records")
+    widths = [max(len(column), *(len(str(result.get(column))) for result in results)) for column in columns]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result.get(column)).rjust(width) for column, width in zip(columns, widths)))
+
+
+def child_arguments(argv: list[str]) -> list[str]:
+    """
+    Аргументы командной строки без --channels: дочерний процесс получает их вместе с --single.
+    """
+    forwarded, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == "--channels":
+            skip = True
+        elif not arg.startswith("--channels="):
+            forwarded.append(arg)
+    return forwarded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный стенд сбора новостей")
+    parser.add_argument("--channels", default="10,100,1000,10000", help="Масштабы через запятую")
+    parser.add_argument("--single", type=int, help="Запустить один масштаб в текущем процессе")
+    parser.add_argument("--duration", type=float, default=60, help="Длительность прогона одного масштаба, с")
+    parser.add_argument("--posts-per-hour", type=float, default=12, help="Частота публикаций одного канала")
+    parser.add_argument("--backlog", type=int, default=20, help="Старых постов в каждом канале")
+    parser.add_argument("--sites", type=int, default=0, help="Число новостных сайтов с RSS")
+    parser.add_argument("--image-bytes", type=int, default=200 * 1024, help="Размер изображения поста")
+    parser.add_argument("--video-bytes", type=int, default=2 * 1024 * 1024, help="Размер видео поста")
+    parser.add_argument("--video-ratio", type=float, default=0.1, help="Доля постов с видео")
+    parser.add_argument("--media-policy", default="full", help="Политика загрузки медиа источников")
+    parser.add_argument("--no-image-processing", dest="image_processing", action="store_false",
+                        help="Отключить пережатие изображений")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Задержка ответа API, с")
+    parser.add_argument("--api-jitter", type=float, default=0.0, help="Разброс задержки API, с")
+    parser.add_argument("--rps", type=float, default=1000, help="Лимит запросов в секунду к заменителям")
+    parser.add_argument("--channel-ttl", type=int, default=0, help="Время жизни кеша страниц каналов, с")
+    parser.add_argument("--pass-interval", type=float, default=1.0, help="Минимальная длительность прохода по каналам, с")
+    parser.add_argument("--chunk", type=int, default=50, help="Каналов за один вызов get_telegram_news")
+    parser.add_argument("--no-consumer", action="store_true", help="Не разбирать очередь filter")
+    parser.add_argument("--log-level", default="WARNING", help="Уровень логирования сервиса")
+    parser.add_argument("--verbose", action="store_true", help="Не подавлять вывод print в stdout")
+    args = parser.parse_args()
+
+    if args.single:
+        print(RESULT_PREFIX + json.dumps(run_single(args), ensure_ascii=False), flush=True)
+        return
+
+    results = []
+    for channels in (int(value) for value in args.channels.split(",")):
+        print(f"Прогон на {channels} каналов...", file=sys.stderr, flush=True)
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.loadtest.run", "--single", str(channels), *child_arguments(sys.argv[1:])],
+            cwd=ROOT, stdout=subprocess.PIPE, text=True
+        )
+        lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+        if completed.returncode != 0 or not lines:
+            print(f"Прогон на {channels} каналов завершился с ошибкой (код {completed.returncode})", file=sys.stderr)
+            continue
+        result = json.loads(lines[-1][len(RESULT_PREFIX):])
+        print(json.dumps(result, ensure_ascii=False), file=sys.stderr)
+        results.append(result)
+    if results:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Микробенчмарк сериализации: python -m benchmarks.serialization [--number N]
+
+Сравнивает прежние вызовы (json, pydantic .dict()/parse_obj) с src.serialization
+на типичных данных сервиса: элемент очереди, запись Loki, строка snscrape и ответ API.
+"""
+import argparse
+import json
+import timeit
+import warnings
+
+from src import serialization
+from src.request.schemas import NewPostRequestModel, NewsExistsResponseModel
+
+TEXT = "В Москве на Тверской улице произошло крупное ДТП с участием трех автомобилей. " * 12
+
+QUEUE_ITEM = {"channel": "moscow", "content": TEXT, "id_post": 123456,
+              "outlinks": [f"https://example.com/news/{i}" for i in range(5)]}
+LOKI_PAYLOAD = {"streams": [{"stream": {"project": "TelegramParser", "level": "INFO", "channel": "moscow"},
+                             "values": [["1700000000000000000", TEXT]]}]}
+SNSCRAPE_LINE = json.dumps({"url": "https://t.me/s/moscow/123456", "date": "2024-05-01T10:00:00+00:00",
+                            "content": TEXT, "outlinks": QUEUE_ITEM["outlinks"]})
+EXISTS_RESPONSE = b'{"exists": false}'
+NEW_POST = NewPostRequestModel(channel="moscow", text=TEXT, id_post=123456, time="2024-05-01 10:00:00",
+                               url="https://t.me/s/moscow/123456", outlinks=QUEUE_ITEM["outlinks"])
+
+CASES = {
+    "элемент очереди": (
+        lambda: json.dumps(QUEUE_ITEM),
+        lambda: serialization.dumps(QUEUE_ITEM),
+    ),
+    "запись Loki": (
+        lambda: json.dumps(LOKI_PAYLOAD),
+        lambda: serialization.dumps(LOKI_PAYLOAD),
+    ),
+    "строка snscrape": (
+        lambda: json.loads(SNSCRAPE_LINE),
+        lambda: serialization.loads(SNSCRAPE_LINE),
+    ),
+    "ответ API -> модель": (
+        lambda: NewsExistsResponseModel.parse_obj(json.loads(EXISTS_RESPONSE)),
+        lambda: serialization.validate(NewsExistsResponseModel, EXISTS_RESPONSE),
+    ),
+    "тело POST": (
+        lambda: json.dumps(NEW_POST.dict()),
+        lambda: serialization.dumps(serialization.to_dict(NEW_POST)),
+    ),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Микробенчмарк сериализации")
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    backend = "orjson" if serialization.orjson is not None else "json"
+    print(f"Бэкенд src.serialization: {backend}, повторов: {args.number}")
+    print(f"{'операция':<24}{'было, мкс':>12}{'стало, мкс':>12}{'ускорение':>11}")
+    for name, (baseline, optimized) in CASES.items():
+        before = min(timeit.repeat(baseline, number=args.number, repeat=3)) / args.number * 1e6
+        after = min(timeit.repeat(optimized, number=args.number, repeat=3)) / args.number * 1e6
+        print(f"{name:<24}{before:>12.2f}{after:>12.2f}{before / after:>10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
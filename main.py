@@ -1,37 +1,31 @@
 import asyncio
 import os
-import json
 import re
+import signal
+import sys
 import time
-from typing import Any
+from contextlib import ExitStack
+from typing import Any, Optional
 from datetime import datetime
 from src.feature.TeleParser import TeleScraperDict
-from src.feature.TelegramParser import TelegramLastNews
+from src.feature.TelegramParser import TelegramLastNews, TelegramWebLastNews
+from src.feature.MediaPolicy import MediaPolicy
 from src.feature.newspaper_parser import NewsParser
 from src.request.schemas import NewsExistsResponseModel, NewsExistsRequestModel, NewPostResponseModel, \
     NewPostRequestModel, UploadMediaPathParams
+from src.conf import OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_DEAD_LETTER_BACKOFF, OUTBOX_DEAD_LETTER_ROUNDS, \
+    DEDUP_MODE, SCHEDULER_MAX_SLEEP, \
+    BACKPRESSURE_MIN_PRIORITY, BACKPRESSURE_DEFER, MEDIA_POLICIES, MEDIA_DEFERRED_BATCH, MEDIA_DEFERRED_MAX_BYTES, \
+    TELEGRAM_FETCHER, SUPERVISOR, SUPERVISOR_STATE_PATH, WORKER_ID, WORKER_MAX_CYCLES, WORKER_MAX_RSS_MB
 from src.logger import logger
-from src.service import redis, api
+from src.outbox.Outbox import STAGE_NEW, STAGE_CREATED, STAGE_UPLOADED
+from src.redis.Backpressure import STATE_NORMAL
+from src.registry.SourceRegistry import Source
+from src.supervisor import MemoryMonitor, Supervisor
+from src.freshness import STAGE_FETCHED, STAGE_ENQUEUED, parse_timestamp, stamp
+from src import serialization, service
 
 
-def filter_outlinks_in_news_list(news_list: list[dict]) -> list[dict]:
-    """
-    Фильтрует t.me-ссылки в outlinks для всего списка новостей.
-    Возвращает новый список новостей с очищенными ссылками.
-    Сохраняет исходные данные неизменными.
-    """
-    filtered_news = []
-    for news in news_list:
-        if 'outlinks' in news and isinstance(news['outlinks'], list):
-            # Фильтруем ссылки, удаляя содержащие https://t.me/
-            filtered_links = [link for link in news['outlinks'] if 'https://t.me/' not in link]
-            # Создаем копию новости с обновленными ссылками
-            filtered_news.append({**news, 'outlinks': filtered_links})
-        else:
-            # Если нет outlinks - оставляем как есть
-            filtered_news.append(news)
-    return filtered_news
-
 def extract_channel_and_post_id(url: str) -> tuple[str | Any, ...] | tuple[None, None]:
     match = re.search(r'https://t\.me/s/([^/]+)/(\d+)', url)
     if not match:
@@ -39,23 +33,23 @@ def extract_channel_and_post_id(url: str) -> tuple[str | Any, ...] | tuple[None,
     return match.groups() if match else (None, None)
 
 
-def get_news(channel: str, id_post: int) -> NewsExistsResponseModel:
+def get_news(channel: str, id_post: int) -> NewsExistsResponseModel | None:
     logger.debug("Запрос к API на проверку новости", extra={"tags": {
         "channel": channel,
         "post_id": id_post,
         "api_operation": "check_news"
     }})
     params = NewsExistsRequestModel(channel=channel, id_post=id_post)
-    response = api.get("all-news/exists-news/{channel}/{id_post}", path_params=params, response_model=NewsExistsResponseModel)
+    response = service.api.get("all-news/exists-news/{channel}/{id_post}", path_params=params, response_model=NewsExistsResponseModel)
     logger.debug("Ответ API получен", extra={"tags": {
         "channel": channel,
         "post_id": id_post,
-        "api_response": response.dict()
+        "api_response": serialization.to_dict(response) if response else None
     }})
     return response
 
 
-def create_news(channel: str, id_post: int, text: str, timestamp: str, url: str, outlinks: list) -> None:
+def create_news(channel: str, id_post: int, text: str, timestamp: str, url: str, outlinks: list) -> bool:
     try:
         data = NewPostRequestModel(channel=channel, id_post=id_post, text=text, time=timestamp, url=url, outlinks=outlinks)
         logger.info("Отправка данных для создания новости", extra={"tags": {
@@ -63,17 +57,21 @@ def create_news(channel: str, id_post: int, text: str, timestamp: str, url: str,
             "post_id": id_post,
             "data_length": len(text)
         }})
-        api.post("all-news/create", data=data, response_model=NewPostResponseModel)
+        response = service.api.post("all-news/create", data=data, response_model=NewPostResponseModel)
+        if response is None:
+            return False
         logger.info("Новость успешно создана", extra={"tags": {
             "channel": channel,
             "post_id": id_post,
         }})
+        return True
     except Exception as e:
         logger.error("Ошибка создания новости", extra={"tags": {
             "channel": channel,
             "post_id": id_post,
             "error": str(e)
         }})
+        return False
 
 
 async def upload_media_files(id_post: int, channel: str, images: list[str], videos: list[str]) -> dict:
@@ -82,158 +80,425 @@ async def upload_media_files(id_post: int, channel: str, images: list[str], vide
         "post_id": id_post,
         "total_files": len(images) + len(videos)
     }})
-    files = []
 
-    try:
-        for image in images:
-            # Добавляем префикс пути к изображениям
-            image_path = os.path.join('media', 'img', image)
-            if os.path.exists(image_path):
-                files.append(('files', ('image.jpg', open(image_path, 'rb'), 'image/jpeg')))
-            else:
-                print(f"Файл изображения не найден: {image_path}")
+    # ExitStack закрывает все открытые файлы при любом исходе, включая ошибку на середине списка
+    with ExitStack() as stack:
+        files = []
+        try:
+            images = await service.image_processor.process_many(images)
+            for image in images:
+                # Добавляем префикс пути к изображениям
+                image_path = os.path.join('media', 'img', image)
+                if os.path.exists(image_path):
+                    mime_type = 'image/webp' if image.endswith('.webp') else 'image/jpeg'
+                    extension = '.webp' if image.endswith('.webp') else '.jpg'
+                    files.append(('files', (f'image{extension}', stack.enter_context(open(image_path, 'rb')),
+                                            mime_type)))
+                else:
+                    print(f"Файл изображения не найден: {image_path}")
 
-        for video in videos:
-            # Добавляем префикс пути к видео
-            video_path = os.path.join('media', 'video', video)
-            if os.path.exists(video_path):
-                files.append(('files', ('video.mp4', open(video_path, 'rb'), 'video/mp4')))
-            else:
-                print(f"Видео файл не найден: {video_path}")
+            for video in videos:
+                # Добавляем префикс пути к видео
+                video_path = os.path.join('media', 'video', video)
+                if os.path.exists(video_path):
+                    files.append(('files', ('video.mp4', stack.enter_context(open(video_path, 'rb')), 'video/mp4')))
+                else:
+                    print(f"Видео файл не найден: {video_path}")
 
-        if not files:
-            print("Нет файлов для загрузки")
-            return {}
+            if not files:
+                print("Нет файлов для загрузки")
+                return {}
 
-        path_params = UploadMediaPathParams(id_post=id_post, channel=channel)
-        response = api.post_files(
-            endpoint="media/upload/{id_post}/{channel}",
-            path_params=path_params,
-            files=files
-        )
-        if response:
-            logger.info("Медиа загружено успешно", extra={"tags": {
+            path_params = UploadMediaPathParams(id_post=id_post, channel=channel)
+            response = service.api.post_files(
+                endpoint="media/upload/{id_post}/{channel}",
+                path_params=path_params,
+                files=files
+            )
+            if response:
+                logger.info("Медиа загружено успешно", extra={"tags": {
+                    "channel": channel,
+                    "post_id": id_post,
+                    "uploaded_files": len(files),
+                    "response_status": response.get("status")
+                }})
+            else:
+                logger.error("Ошибка загрузки медиа", extra={"tags": {
+                    "channel": channel,
+                    "post_id": id_post
+                }})
+            return response
+        except Exception as e:
+            logger.error("Ошибка при загрузке медиа", extra={"tags": {
                 "channel": channel,
                 "post_id": id_post,
-                "uploaded_files": len(files),
-                "response_status": response.get("status")
+                "error": str(e)
             }})
-        else:
-            logger.error("Ошибка загрузки медиа", extra={"tags": {
-                "channel": channel,
-                "post_id": id_post
-            }})
-        return response
-    except Exception as e:
-        logger.error("Ошибка при загрузке медиа", extra={"tags": {
+            return {}
+
+
+def track_news(channel: str, id_post: int, payload: dict) -> bool:
+    """
+    Проверяет, что новости еще нет в базе, и записывает ее в outbox для дальнейшей обработки.
+    Возвращает True, если новость добавлена.
+    """
+    if service.outbox.contains(channel, id_post):
+        logger.debug("Новость уже в outbox", extra={"tags": {"channel": channel, "post_id": id_post}})
+        return False
+    if not payload.get("text"):
+        return False
+    stamp(payload, STAGE_FETCHED)
+
+    exists_response = get_news(channel=channel, id_post=id_post) if service.api.available else None
+    if exists_response is None:
+        # API недоступен: новость копится в outbox непроверенной, проверка будет при его восстановлении.
+        # Непроверенная запись не считается новой, чтобы сбой не учащал опрос источника
+        logger.info("API недоступно, новость отложена в outbox без проверки", extra={"tags": {
             "channel": channel,
             "post_id": id_post,
-            "error": str(e)
+            "operation": "outbox_spool"
         }})
-        return {}
-    finally:
-        logger.debug("Завершение обработки медиа-файлов", extra={"tags": {
+        service.outbox.add(channel, id_post, {**payload, "unchecked": True})
+        return False
+
+    logger.info(f"Проверка существования новости: {exists_response.exists}", extra={"tags": {
+        "channel": channel,
+        "post_id": id_post
+    }})
+
+    if not exists_response.exists:
+        logger.info("Создание новой записи", extra={"tags": {
             "channel": channel,
             "post_id": id_post,
-            "closed_files": len(files)
+            "operation": "outbox_add",
+            "parser": payload["source_type"]
         }})
-        for file_tuple in files:
-            try:
-                file_tuple[1][1].close()
-            except Exception as error:
-                logger.error(error)
+        return service.outbox.add(channel, id_post, payload)
+    return False
+
+
+def fail_outbox_item(item: dict, stage: str, error: Optional[Exception] = None) -> int:
+    """
+    Учитывает неудачную попытку обработки записи outbox, не останавливая остальную пачку.
+    Запись, исчерпавшая попытки, становится dead letter и возвращается в работу revive_dead_letters.
+    Возвращает новое число попыток.
+    """
+    if error is not None:
+        logger.error("Ошибка обработки записи outbox", exc_info=True, extra={"tags": {
+            "channel": item["channel"],
+            "post_id": item["id_post"],
+            "stage": stage,
+            "error_type": type(error).__name__
+        }})
+    attempts = service.outbox.fail(item)
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        logger.error("Запись outbox исчерпала попытки и отложена", extra={"tags": {
+            "channel": item["channel"],
+            "post_id": item["id_post"],
+            "stage": stage,
+            "attempts": attempts,
+            "dead_letter_round": item["payload"].get("dead_letter_rounds", 0)
+        }})
+    return attempts
+
+
+def revive_dead_letters(batch_size: int = OUTBOX_BATCH_SIZE) -> None:
+    """
+    Возвращает в обработку записи, исчерпавшие попытки, когда истекла их пауза
+    (OUTBOX_DEAD_LETTER_BACKOFF, удваивается с каждым кругом). После OUTBOX_DEAD_LETTER_ROUNDS кругов
+    запись удаляется, а водяной знак канала опускается ниже нее, чтобы track_news получил новость заново,
+    если она еще есть на странице канала.
+    """
+    now = time.time()
+    dropped = []
+    for item in service.outbox.dead_letters(batch_size):
+        rounds = item["payload"].get("dead_letter_rounds", 0)
+        tags = {"channel": item["channel"], "post_id": item["id_post"], "stage": item["stage"], "dead_letter_round": rounds}
+        if rounds >= OUTBOX_DEAD_LETTER_ROUNDS:
+            logger.error("Запись outbox удалена после всех повторов", extra={"tags": tags})
+            dropped.append(item)
+        elif now - item["updated_at"] >= OUTBOX_DEAD_LETTER_BACKOFF * 2 ** rounds:
+            logger.error("Запись outbox возвращена в обработку", extra={"tags": tags})
+            item["payload"]["dead_letter_rounds"] = rounds + 1
+            service.outbox.retry(item)
+    if dropped:
+        service.outbox.complete(dropped)
+        for item in dropped:
+            if item["payload"].get("source_type") == "telegram":
+                service.scheduler.rewind_watermark(item["payload"].get("source", item["channel"]), item["id_post"] - 1)
+
+
+def drain_created_stage(batch_size: int) -> int:
+    if not service.api.available:
+        return 0
+    items = service.outbox.pending(STAGE_NEW, batch_size)
+    # Ссылки канонизируются и раскрываются до создания новости, чтобы в базу и очередь попадали чистые адреса
+    try:
+        service.outlinks.process_many([item["payload"] for item in items])
+        outlinks_pending = False
+    except Exception:
+        # Ошибку пачки разбираем по записям, чтобы она не задерживала остальные
+        logger.warning("Ошибка обработки ссылок пачки, ссылки обрабатываются по записям", exc_info=True)
+        outlinks_pending = True
+    created, known = [], []
+    for item in items:
+        if not service.api.available:
+            # Цепь разомкнулась посреди пачки - остальные записи ждут восстановления API
+            break
+        try:
+            payload = item["payload"]
+            if outlinks_pending:
+                service.outlinks.process_many([payload])
+            if payload.get("unchecked"):
+                exists_response = get_news(channel=item["channel"], id_post=item["id_post"])
+                if exists_response is None:
+                    if service.api.available:
+                        fail_outbox_item(item, STAGE_NEW)
+                    continue
+                if exists_response.exists:
+                    known.append(item)
+                    continue
+                del payload["unchecked"]
+
+            ok = create_news(channel=item["channel"], id_post=item["id_post"], text=payload["text"],
+                             timestamp=payload["timestamp"], url=payload["url"], outlinks=payload["outlinks"])
+            if not ok and service.api.available:
+                # Новость могла быть создана до падения процесса - тогда повтор не нужен
+                exists_response = get_news(channel=item["channel"], id_post=item["id_post"])
+                ok = bool(exists_response and exists_response.exists)
+            if ok:
+                created.append(item)
+            elif not service.api.available:
+                break
+            else:
+                fail_outbox_item(item, STAGE_NEW)
+        except Exception as e:
+            fail_outbox_item(item, STAGE_NEW, e)
+    if created:
+        now = time.time()
+        for item in created:
+            stamp(item["payload"], STAGE_CREATED, now)
+        service.outbox.advance(created, STAGE_CREATED)
+    if known:
+        # Непроверенные записи, которые уже есть в базе, дальше не обрабатываются
+        service.outbox.complete(known)
+    return len(items)
+
+
+def drain_media_stage(batch_size: int) -> int:
+    if not service.api.available:
+        return 0
+    items = service.outbox.pending(STAGE_CREATED, batch_size)
+    uploaded = []
+    for item in items:
+        if not service.api.available:
+            break
+        try:
+            payload = item["payload"]
+            channel, post_id = item["channel"], item["id_post"]
+
+            if payload.get("media_policy") == "none":
+                payload["images"], payload["videos"] = [], []
+            elif payload["source_type"] == "telegram" and "images" not in payload:
+                logger.debug("Получение медиа-контента", extra={"tags": {
+                    "channel": channel,
+                    "post_id": post_id,
+                    "operation": "get_media"
+                }})
+                policy_name = payload.get("media_policy", "full")
+                policy = MediaPolicy(policy_name, MEDIA_POLICIES.get(policy_name, MEDIA_POLICIES["full"]),
+                                     service.media_budget)
+                result = asyncio.run(TeleScraperDict(payload["url"], media_policy=policy).get())
+                payload["images"] = result.get('images', [])
+                payload["videos"] = result.get('videos', [])
+                if result.get('deferred'):
+                    service.deferred_media.send_many_to_queue([
+                        {"channel": channel, "id_post": post_id, "post_url": payload["url"], **media}
+                        for media in result['deferred']
+                    ])
+
+            images, videos = payload.get("images", []), payload.get("videos", [])
+            if images or videos:
+                logger.info(f"Найдено медиа: {len(images)} изображений, {len(videos)} видео", extra={"tags": {
+                    "channel": channel,
+                    "post_id": post_id,
+                    "media_operation": "upload"
+                }})
+                response = asyncio.run(upload_media_files(images=images, videos=videos, id_post=post_id, channel=channel))
+                if not response and not service.api.available:
+                    # Скачанные файлы остаются на диске и загружаются после восстановления API
+                    service.outbox.save(item)
+                    break
+                if not response:
+                    if service.outbox.fail(item) < OUTBOX_MAX_ATTEMPTS:
+                        continue
+                    logger.error("Медиа не загружено после всех попыток, новость отправляется без медиа", extra={"tags": {
+                        "channel": channel,
+                        "post_id": post_id,
+                        "attempts": item["attempts"]
+                    }})
+            uploaded.append(item)
+        except Exception as e:
+            fail_outbox_item(item, STAGE_CREATED, e)
+    if uploaded:
+        now = time.time()
+        for item in uploaded:
+            stamp(item["payload"], STAGE_UPLOADED, now)
+        service.outbox.advance(uploaded, STAGE_UPLOADED)
+    return len(items)
+
+
+def build_queue_item(item: dict) -> dict | None:
+    """
+    Формирует элемент очереди filter. Почти-дубликаты помечаются ссылкой на исходную новость
+    или отбрасываются в зависимости от DEDUP_MODE.
+    """
+    payload = item["payload"]
+    # Тип id_post в очереди прежний: у постов Telegram - строка из URL, у статей сайтов - число
+    id_post = str(item["id_post"]) if payload["source_type"] == "telegram" else item["id_post"]
+    json_news = {"channel": item["channel"], "content": payload["text"],
+                 "id_post": id_post, "outlinks": payload["outlinks"],
+                 "published_at": payload.get("published_at"), "stages": payload.get("stages", {})}
+    if DEDUP_MODE == "off":
+        return json_news
+
+    original = service.dedup.check_and_add(item["channel"], item["id_post"], payload["text"])
+    if original:
+        logger.info("Найден почти-дубликат", extra={"tags": {
+            "channel": item["channel"],
+            "post_id": item["id_post"],
+            "original_channel": original["channel"],
+            "original_post_id": original["id_post"],
+            "dedup_mode": DEDUP_MODE
+        }})
+        if DEDUP_MODE == "suppress":
+            return None
+        json_news["duplicate_of"] = original
+    return json_news
+
+
+def drain_enqueue_stage(batch_size: int) -> int:
+    if service.backpressure.paused:
+        logger.warning("Постановка в очередь приостановлена, новости ждут в outbox", extra={"tags": {
+            "operation": "redis_queue",
+            "queue_depth": service.backpressure.depth
+        }})
+        return 0
+    items = service.outbox.pending(STAGE_UPLOADED, batch_size)
+    if not items:
+        return 0
+    now = time.time()
+    queue_items, built = [], []
+    for item in items:
+        stamp(item["payload"], STAGE_ENQUEUED, now)
+        try:
+            queue_items.append(build_queue_item(item))
+            built.append(item)
+        except Exception as e:
+            fail_outbox_item(item, STAGE_UPLOADED, e)
+    service.redis.send_many_to_queue([json_news for json_news in queue_items if json_news])
+    service.outbox.complete(built)
+    for item in built:
+        service.freshness.observe(item["payload"].get("source", item["channel"]), item["payload"])
+    logger.info("Новости добавлены в очередь Redis", extra={"tags": {
+        "operation": "redis_queue",
+        "batch_size": len(items),
+        "suppressed": queue_items.count(None)
+    }})
+    return len(items)
+
+
+def drain_outbox(batch_size: int = OUTBOX_BATCH_SIZE) -> None:
+    """
+    Проводит все незавершенные записи outbox через создание, загрузку медиа и постановку в очередь.
+    Каждая стадия обрабатывается пачками, пока в ней есть записи; ошибка одной стадии не останавливает остальные.
+    """
+    revive_dead_letters(batch_size)
+    logger.info("Обработка outbox", extra={"tags": {"operation": "outbox_drain", **service.outbox.counts()}})
+    for stage in (drain_created_stage, drain_media_stage, drain_enqueue_stage):
+        try:
+            while stage(batch_size) == batch_size:
                 pass
+        except Exception as e:
+            logger.error("Ошибка стадии outbox", exc_info=True, extra={"tags": {
+                "operation": "outbox_drain",
+                "stage": stage.__name__,
+                "error_type": type(e).__name__
+            }})
+
 
-def get_telegram_news():
+def owned_sources(source_type: str) -> list[Source]:
+    """
+    Возвращает источники указанного типа, закрепленные за текущей репликой.
+    """
+    registry = service.registry
+    registry.reload()
+    owned = service.shard.filter_owned(registry.names(), version=registry.version)
+    return [source for source in map(registry.get, owned) if source and source.type == source_type]
+
+
+def get_telegram_news(channels: list[Source] | None = None) -> dict[str, int]:
+    """
+    Собирает новости каналов Telegram. Без аргументов обрабатывает все каналы этой реплики.
+    Возвращает число новых записей по каждому каналу.
+    """
+    found: dict[str, int] = {}
     try:
         logger.info("Запуск цикла сбора новостей")
-        channels = ["exploitex", "moscowmap", "whackdoor", "moscowachplus", "novosti_efir", "moscow", "chp_sochi"]
-        parser = TelegramLastNews()
+        if channels is None:
+            channels = owned_sources("telegram")
+        parser = TelegramWebLastNews() if TELEGRAM_FETCHER == "web" else TelegramLastNews()
         
         logger.info("Начало сбора новостей", extra={"tags": {"process": "news_collection"}})
         
-        for channel in channels:
+        for source in channels:
+            channel = source.name
+            found[channel] = 0
             logger.info(f"Обработка канала: {channel}", extra={"tags": {"channel": channel}})
             
             try:
-                last_news = filter_outlinks_in_news_list(parser.get(channel))
+                last_news = parser.get(channel)
                 logger.debug(f"Получено {len(last_news)} новостей", extra={"tags": {"channel": channel}})
                 logger.debug(f"Список новостей", extra={"tags": {"list_news": last_news}})
 
+                # Записи не новее водяного знака уже обработаны - их не проверяем в API повторно
+                watermark = service.scheduler.watermark(channel)
+                newest = watermark
                 for news in last_news:
                     channel_name, post_id = extract_channel_and_post_id(news["url"])
+                    if post_id and int(post_id) <= watermark:
+                        continue
                     logger.debug(f"Обработка новости: {news['url']}", extra={"tags": {
                         "channel": channel_name,
                         "post_id": post_id
                     }})
                     
                     if channel_name and post_id:
-                        exists_response = get_news(channel=channel_name, id_post=int(post_id))
-                        logger.info(f"Проверка существования новости: {exists_response.exists}", extra={"tags": {
-                            "channel": channel_name,
-                            "post_id": post_id
-                        }})
-                        
-                        if not exists_response.exists and news.get("content"):
-                            # Логируем создание новой записи
-                            logger.info("Создание новой записи", extra={"tags": {
-                                "channel": channel_name,
-                                "post_id": post_id,
-                                "operation": "create_news"
-                            }})
-                            
-                            create_news(channel=channel_name, id_post=int(post_id), timestamp=news.get("date"), 
-                                      url=news["url"], text=news.get("content"), outlinks=news.get("outlinks"))
-
-                            logger.debug("Получение медиа-контента", extra={"tags": {
-                                "channel": channel_name,
-                                "post_id": post_id,
-                                "operation": "get_media"
-                            }})
-                            
-                            scraper = TeleScraperDict(news["url"])
-                            result = asyncio.run(scraper.get())
-                            
-                            if result.get('images') or result.get('videos'):
-                                logger.info(f"Найдено медиа: {len(result.get('images', []))} изображений, "
-                                          f"{len(result.get('videos', []))} видео", extra={"tags": {
-                                              "channel": channel_name,
-                                              "post_id": post_id,
-                                              "media_operation": "upload"
-                                          }})
-                                
-                                asyncio.run(upload_media_files(
-                                    images=result.get('images', []),
-                                    videos=result.get('videos', []),
-                                    id_post=post_id,
-                                    channel=channel,
-                                ))
-                                logger.debug("Медиа успешно загружено", extra={"tags": {
-                                    "channel": channel_name,
-                                    "post_id": post_id,
-                                    "media_operation": "success"
-                                }})
-                                
-                            json_news = {"channel": channel_name, "content": news["content"], 
-                                       "id_post": post_id, "outlinks": news["outlinks"]}
-                            redis.send_to_queue(json.dumps(json_news))
-                            logger.info("Новость добавлена в очередь Redis", extra={"tags": {
-                                "channel": channel_name,
-                                "post_id": post_id,
-                                "operation": "redis_queue"
-                            }})
+                        newest = max(newest, int(post_id))
+                        found[channel] += track_news(channel_name, int(post_id), {
+                            "source_type": "telegram",
+                            "source": channel,
+                            "text": news.get("content"),
+                            "timestamp": news.get("date"),
+                            "published_at": parse_timestamp(news.get("date")),
+                            "url": news["url"],
+                            "outlinks": news.get("outlinks") or [],
+                            "media_policy": source.media_policy
+                        })
                     else:
                         logger.warning("Не удалось извлечь channel_name или post_id", extra={"tags": {
                             "url": news["url"],
                             "channel": channel
                         }})
-                    
+                service.scheduler.advance_watermark(channel, newest)
+
             except Exception as e:
                 logger.error(f"Ошибка при обработке канала {channel}: {str(e)}", extra={"tags": {
                     "channel": channel,
                     "error_type": type(e).__name__
                 }}, exc_info=True)
                 continue
+        drain_outbox()
         logger.info("Цикл сбора новостей завершен", extra={"tags": {
             "processed_channels": len(channels)
         }})
@@ -241,55 +506,193 @@ def get_telegram_news():
         logger.critical("Критическая ошибка в основном цикле", exc_info=True, extra={"tags": {
             "error_type": type(e).__name__
         }})
-def pars_site_news():
-    articles = NewsParser().get_latest_articles()
-    for article in articles:
-        channel = article['source']
-        post_id = article['id']
-        text = article['title'] + article["text"]
-
-        exists_response = get_news(channel=channel, id_post=int(post_id))
-        logger.info(f"Проверка существования новости: {exists_response.exists}", extra={"tags": {
-            "channel": channel,
-            "post_id": post_id
-        }})
+    return found
 
-        if not exists_response.exists and text:
-            logger.info("Создание новой записи", extra={"tags": {
-                "channel": channel,
-                "post_id": post_id,
-                "operation": "create_news",
-                "parser": "site"
+
+def pars_site_news(sites: list[Source] | None = None) -> dict[str, int]:
+    """
+    Собирает последние статьи сайтов. Без аргументов обрабатывает все сайты этой реплики.
+    Возвращает число новых записей по каждому сайту.
+    """
+    if sites is None:
+        sites = owned_sources("site")
+    policies = {source.name: source.media_policy for source in sites}
+    found = dict.fromkeys(policies, 0)
+    parser = NewsParser(sites=list(policies), rss_map={source.name: source.rss for source in sites if source.rss})
+    for article in parser.get_latest_articles():
+        # Время публикации берется из статьи; если сайт его не указал - время получения
+        published_at = parse_timestamp(article.get('publish_date'))
+        published = datetime.fromtimestamp(published_at) if published_at is not None else datetime.now()
+        found[article['site']] += track_news(article['source'], int(article['id']), {
+            "source_type": "site",
+            "source": article['site'],
+            "text": article['title'] + article["text"],
+            "timestamp": published.strftime('%Y-%m-%d %H:%M:%S.%f'),
+            "published_at": published_at,
+            "url": article['url'],
+            "outlinks": [],
+            "images": article['top_image_local'],
+            "videos": [],
+            "media_policy": policies[article['site']]
+        })
+    drain_outbox()
+    return found
+
+
+def drain_deferred_media(limit: int = MEDIA_DEFERRED_BATCH) -> None:
+    """
+    Догружает отложенные политикой медиа, пока в бюджете такта остаются байты.
+    """
+    budget = service.media_budget
+    for _ in range(limit):
+        if budget.remaining <= 0 or not service.api.available:
+            return
+        media = service.deferred_media.receive_from_queue(block=False)
+        if media is None:
+            return
+
+        size = media.get("size")
+        if size is not None and size > MEDIA_DEFERRED_MAX_BYTES:
+            logger.warning("Отложенное медиа превышает предел и пропущено", extra={"tags": {
+                "channel": media["channel"],
+                "post_id": media["id_post"],
+                "size": size
             }})
-            create_news(
-                channel=channel,
-                id_post=int(post_id),
-                timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'),
-                url=article['url'],
-                text=text,
-                outlinks=[]
-            )
-            asyncio.run(upload_media_files(
-                images=article['top_image_local'],
-                videos=[],
-                id_post=int(article['id']),
-                channel=article['source']
+            continue
+        if size is not None and not budget.reserve(size):
+            service.deferred_media.send_many_to_queue([media])
+            return
+
+        filename = TeleScraperDict(media["post_url"]).save_media(media["url"], media["type"],
+                                                                 max_bytes=MEDIA_DEFERRED_MAX_BYTES)
+        if filename:
+            response = asyncio.run(upload_media_files(
+                id_post=media["id_post"],
+                channel=media["channel"],
+                images=[filename] if media["type"] == 'img' else [],
+                videos=[filename] if media["type"] == 'vid' else [],
             ))
-            json_news = {
-                "channel": channel,
-                "content": text,
-                "id_post": post_id,
-                "outlinks": []
-            }
-            redis.send_to_queue(json.dumps(json_news))
-            logger.info("Новость добавлена в очередь Redis", extra={"tags": {
-                "channel": channel,
-                "post_id": post_id,
-                "operation": "redis_queue"
+            if not response and not service.api.available:
+                service.deferred_media.send_many_to_queue([media])
+                return
+
+
+_synced_assignment = None
+
+
+def run_cycle() -> float:
+    """
+    Один такт планировщика: опрашивает источники, время которых наступило, и возвращает паузу до следующего такта.
+    """
+    global _synced_assignment
+    registry, scheduler = service.registry, service.scheduler
+    registry.reload()
+    owned = service.shard.filter_owned(registry.names(), version=registry.version)
+    if owned is not _synced_assignment:
+        scheduler.sync({name: registry.get(name) for name in owned})
+        _synced_assignment = owned
+
+    due = scheduler.due()
+    service.media_budget.reset()
+    if service.backpressure.update(force=True) != STATE_NORMAL:
+        # Очередь перегружена: низкоприоритетные источники откладываем, пока она не разгрузится
+        deferred = [source for source in due if source.priority < BACKPRESSURE_MIN_PRIORITY]
+        if deferred:
+            for source in deferred:
+                scheduler.schedule(source.name, time.time() + BACKPRESSURE_DEFER)
+            due = [source for source in due if source.priority >= BACKPRESSURE_MIN_PRIORITY]
+            logger.info("Источники отложены из-за глубины очереди", extra={"tags": {
+                "deferred_sources": len(deferred),
+                "queue_depth": service.backpressure.depth
+            }})
+
+    found: dict[str, int] = {}
+    telegram = [source for source in due if source.type == "telegram"]
+    sites = [source for source in due if source.type == "site"]
+    if telegram:
+        found.update(get_telegram_news(telegram))
+    if sites:
+        try:
+            found.update(pars_site_news(sites))
+        except Exception as e:
+            logger.critical("Критическая ошибка при сборе статей сайтов", exc_info=True, extra={"tags": {
+                "error_type": type(e).__name__
+            }})
+
+    if service.backpressure.state == STATE_NORMAL:
+        try:
+            drain_deferred_media()
+        except Exception as e:
+            logger.error("Ошибка загрузки отложенных медиа", exc_info=True, extra={"tags": {
+                "error_type": type(e).__name__
             }})
 
+    now = time.time()
+    for source in due:
+        scheduler.mark(source, found.get(source.name, 0), now)
+    service.metrics.set_gauge("outbox_items", sum(service.outbox.counts().values()))
+    service.metrics.set_gauge("api_available", int(service.api.available))
+    service.freshness.report()
+    service.metrics.export()
+
+    next_wakeup = scheduler.next_wakeup()
+    if next_wakeup is None:
+        return SCHEDULER_MAX_SLEEP
+    return min(max(next_wakeup - time.time(), 1), SCHEDULER_MAX_SLEEP)
+
+
+def run_worker(conn=None, state: dict | None = None, max_cycles: int | None = None,
+               max_rss: int | None = None) -> None:
+    """
+    Рабочий цикл сборщика. Под супервизором получает состояние планировщика предыдущего процесса,
+    после каждого такта отправляет текущее через conn и завершается после max_cycles тактов
+    или при RSS больше max_rss байт.
+    """
+    # SIGTERM завершает процесс через SystemExit, чтобы при остановке аренда реплики была снята
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if state:
+        service.scheduler.restore(state)
+    service.shard.start()
+    # Дочищаем записи, не обработанные до предыдущей остановки
+    try:
+        drain_outbox()
+    except Exception as e:
+        logger.error("Ошибка обработки outbox при запуске", exc_info=True, extra={"tags": {
+            "error_type": type(e).__name__
+        }})
+    monitor = MemoryMonitor(service.metrics)
+    cycle = 0
+    recycled = False
+    try:
+        while max_cycles is None or cycle < max_cycles:
+            pause = run_cycle()
+            cycle += 1
+            rss = monitor.sample(cycle)
+            if conn is not None:
+                conn.send(service.scheduler.snapshot())
+            if max_rss is not None and rss > max_rss:
+                logger.warning("Превышен порог памяти, рабочий процесс будет перезапущен", extra={"tags": {
+                    "cycle": cycle,
+                    "rss_mb": round(rss / 1024 / 1024, 1),
+                    "max_rss_mb": round(max_rss / 1024 / 1024, 1)
+                }})
+                break
+            if cycle != max_cycles:
+                time.sleep(pause)
+        # Плановый перезапуск под супервизором: следующий процесс продолжает ту же аренду
+        recycled = conn is not None
+    finally:
+        if not recycled:
+            service.shard.stop()
+        service.image_processor.shutdown()
+        service.outlinks.shutdown()
+
+
 if __name__ == '__main__':
-    while True:
-        get_telegram_news()
-        pars_site_news()
-        time.sleep(600)
+    if SUPERVISOR:
+        # Идентификатор реплики общий для всех рабочих процессов, чтобы перезапуск не менял распределение источников
+        os.environ.setdefault("WORKER_ID", WORKER_ID)
+        Supervisor(run_worker, state_path=SUPERVISOR_STATE_PATH, max_cycles=WORKER_MAX_CYCLES,
+                   max_rss=WORKER_MAX_RSS_MB * 1024 * 1024).run()
+    else:
+        run_worker()
@@ -1,7 +1,135 @@
+import json
 import os
+import socket
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-ENV = os.getenv('ENV', "localhost")
\ No newline at end of file
+ENV = os.getenv('ENV', "localhost")
+
+# Шардирование источников между репликами
+WORKER_ID = os.getenv('WORKER_ID', f"{socket.gethostname()}-{os.getpid()}")
+SHARD_LEASE_TTL = int(os.getenv('SHARD_LEASE_TTL', "60"))
+
+# Локальный outbox для пошаговой обработки новостей
+OUTBOX_PATH = os.getenv('OUTBOX_PATH', os.path.join("data", "outbox.sqlite3"))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', "5"))
+# Пауза перед повтором записи, исчерпавшей попытки; удваивается с каждым кругом, после последнего запись удаляется
+OUTBOX_DEAD_LETTER_BACKOFF = int(os.getenv('OUTBOX_DEAD_LETTER_BACKOFF', "3600"))
+OUTBOX_DEAD_LETTER_ROUNDS = int(os.getenv('OUTBOX_DEAD_LETTER_ROUNDS', "3"))
+
+# Поиск почти-дубликатов перед отправкой в очередь filter: off | tag | suppress
+DEDUP_MODE = os.getenv('DEDUP_MODE', "tag")
+DEDUP_BACKEND = os.getenv('DEDUP_BACKEND', "redis")
+DEDUP_WINDOW = int(os.getenv('DEDUP_WINDOW', "21600"))
+# Перепосты с подписью канала, хештегами или другим числом дают расстояние до 3, правка одного слова - до 8-10,
+# разные новости на одну тему - от 20
+DEDUP_MAX_DISTANCE = int(os.getenv('DEDUP_MAX_DISTANCE', "8"))
+DEDUP_MIN_TOKENS = int(os.getenv('DEDUP_MIN_TOKENS', "8"))
+
+# Ограничение частоты запросов к внешним хостам: хост -> (запросов в секунду, размер всплеска)
+RATE_LIMITS = {
+    "t.me": (1.0, 3),
+    "telesco.pe": (5.0, 10),
+    "cdn-telegram.org": (5.0, 10),
+    **{host: tuple(limit) for host, limit in json.loads(os.getenv('RATE_LIMITS', "{}")).items()},
+}
+RATE_LIMIT_DEFAULT = (float(os.getenv('RATE_LIMIT_DEFAULT_RPS', "2")), int(os.getenv('RATE_LIMIT_DEFAULT_BURST', "5")))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', "3"))
+
+# Дисковый кеш HTTP-ответов: срок жизни по типу источника в секундах
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', os.path.join("data", "http_cache"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+HTTP_CACHE_TTLS = {
+    "channel": int(os.getenv('HTTP_CACHE_TTL_CHANNEL', "60")),
+    "telegram_post": int(os.getenv('HTTP_CACHE_TTL_TELEGRAM_POST', "3600")),
+    "rss": int(os.getenv('HTTP_CACHE_TTL_RSS', "300")),
+    "article": int(os.getenv('HTTP_CACHE_TTL_ARTICLE', "86400")),
+}
+# Режим воспроизведения: закешированные ответы отдаются без учета срока жизни и без обращения к сети
+HTTP_CACHE_REPLAY = os.getenv('HTTP_CACHE_REPLAY', "0") == "1"
+
+# Формат элементов очереди filter: json-plain (JSON без заголовка, совместим со старыми потребителями) | json | msgpack
+QUEUE_CODEC = os.getenv('QUEUE_CODEC', "json-plain")
+QUEUE_COMPRESSION = os.getenv('QUEUE_COMPRESSION', "none")
+QUEUE_COMPRESS_THRESHOLD = int(os.getenv('QUEUE_COMPRESS_THRESHOLD', "1024"))
+
+# Реестр источников: file (JSON по SOURCES_PATH) или redis (хеш sources)
+SOURCES_BACKEND = os.getenv('SOURCES_BACKEND', "file")
+SOURCES_PATH = os.getenv('SOURCES_PATH', os.path.join("config", "sources.json"))
+# Максимальная пауза основного цикла: с этой частотой проверяются изменения реестра
+SCHEDULER_MAX_SLEEP = int(os.getenv('SCHEDULER_MAX_SLEEP', "60"))
+
+# Обратное давление по глубине очереди filter
+BACKPRESSURE_HIGH_WATER = int(os.getenv('BACKPRESSURE_HIGH_WATER', "5000"))
+BACKPRESSURE_LOW_WATER = int(os.getenv('BACKPRESSURE_LOW_WATER', "1000"))
+BACKPRESSURE_MAX_DEPTH = int(os.getenv('BACKPRESSURE_MAX_DEPTH', "20000"))
+# Источники с приоритетом ниже этого откладываются, пока очередь выше high water
+BACKPRESSURE_MIN_PRIORITY = int(os.getenv('BACKPRESSURE_MIN_PRIORITY', "2"))
+BACKPRESSURE_DEFER = int(os.getenv('BACKPRESSURE_DEFER', "300"))
+
+# Политики загрузки медиа (имя политики указывается у источника в реестре)
+MEDIA_POLICIES = {
+    "full": {"images": True, "videos": True, "max_image_bytes": 10 * 1024 * 1024,
+             "max_video_bytes": 50 * 1024 * 1024, "max_post_bytes": 80 * 1024 * 1024},
+    "images": {"images": True, "videos": False, "max_image_bytes": 10 * 1024 * 1024,
+               "max_post_bytes": 30 * 1024 * 1024},
+    "none": {"images": False, "videos": False},
+    **json.loads(os.getenv('MEDIA_POLICIES', "{}")),
+}
+# Сколько байт медиа можно скачать за один такт планировщика
+MEDIA_CYCLE_BUDGET = int(os.getenv('MEDIA_CYCLE_BUDGET', str(300 * 1024 * 1024)))
+# Отложенные медиа: сколько обрабатывать за такт и жесткий предел размера
+MEDIA_DEFERRED_BATCH = int(os.getenv('MEDIA_DEFERRED_BATCH', "5"))
+MEDIA_DEFERRED_MAX_BYTES = int(os.getenv('MEDIA_DEFERRED_MAX_BYTES', str(200 * 1024 * 1024)))
+
+# Пережатие изображений перед загрузкой
+IMAGE_PROCESSING = os.getenv('IMAGE_PROCESSING', "1") == "1"
+IMAGE_MAX_SIDE = int(os.getenv('IMAGE_MAX_SIDE', "1280"))
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', "82"))
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', "JPEG")
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', "2"))
+
+# Получение ленты каналов: snscrape (подпроцесс) или web (разбор t.me/s/<канал> напрямую)
+TELEGRAM_FETCHER = os.getenv('TELEGRAM_FETCHER', "snscrape")
+# Адрес, с которого скачиваются страницы t.me (переопределяется для локальных стендов)
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL', "https://t.me").rstrip("/")
+
+# Ссылки из постов: хосты сокращателей, которые раскрываются до адреса назначения
+OUTLINK_SHORTENERS = {
+    "bit.ly", "t.co", "goo.gl", "tinyurl.com", "ow.ly", "is.gd", "buff.ly", "cutt.ly", "rebrand.ly", "tiny.cc",
+    "shorturl.at", "lnkd.in", "clck.ru", "vk.cc", "u.to", "rb.gy",
+    *json.loads(os.getenv('OUTLINK_SHORTENERS', "[]")),
+}
+OUTLINK_RESOLVE = os.getenv('OUTLINK_RESOLVE', "1") == "1"
+# Кеш раскрытых ссылок: memory (только процесс) или redis (общий для реплик, поверх памяти процесса)
+OUTLINK_CACHE_BACKEND = os.getenv('OUTLINK_CACHE_BACKEND', "memory")
+OUTLINK_CACHE_SIZE = int(os.getenv('OUTLINK_CACHE_SIZE', "10000"))
+OUTLINK_CACHE_TTL = int(os.getenv('OUTLINK_CACHE_TTL', str(7 * 24 * 3600)))
+OUTLINK_RESOLVE_WORKERS = int(os.getenv('OUTLINK_RESOLVE_WORKERS', "8"))
+OUTLINK_MAX_REDIRECTS = int(os.getenv('OUTLINK_MAX_REDIRECTS', "5"))
+
+# Режим супервизора: такты сбора идут в дочернем процессе, который перезапускается после
+# WORKER_MAX_CYCLES тактов или при RSS больше WORKER_MAX_RSS_MB
+SUPERVISOR = os.getenv('SUPERVISOR', "0") == "1"
+WORKER_MAX_CYCLES = int(os.getenv('WORKER_MAX_CYCLES', "500"))
+WORKER_MAX_RSS_MB = int(os.getenv('WORKER_MAX_RSS_MB', "512"))
+SUPERVISOR_STATE_PATH = os.getenv('SUPERVISOR_STATE_PATH', os.path.join("data", "scheduler_state.json"))
+
+# Автомат защиты API emily-database-handler: доля ошибок среди последних вызовов, после которой
+# запросы отклоняются сразу, а новые новости и медиа копятся в outbox до восстановления сервиса
+API_BREAKER_WINDOW = int(os.getenv('API_BREAKER_WINDOW', "20"))
+API_BREAKER_MIN_CALLS = int(os.getenv('API_BREAKER_MIN_CALLS', "5"))
+API_BREAKER_FAILURE_RATE = float(os.getenv('API_BREAKER_FAILURE_RATE', "0.5"))
+API_BREAKER_OPEN_SECONDS = int(os.getenv('API_BREAKER_OPEN_SECONDS', "30"))
+API_BREAKER_HALF_OPEN_PROBES = int(os.getenv('API_BREAKER_HALF_OPEN_PROBES', "2"))
+API_TIMEOUT = int(os.getenv('API_TIMEOUT', "10"))
+API_UPLOAD_TIMEOUT = int(os.getenv('API_UPLOAD_TIMEOUT', "120"))
+
+# Свежесть: цель по задержке от публикации до очереди filter и перцентиль, по которому она проверяется
+FRESHNESS_SLO = int(os.getenv('FRESHNESS_SLO', "600"))
+FRESHNESS_SLO_PERCENTILE = float(os.getenv('FRESHNESS_SLO_PERCENTILE', "95"))
+FRESHNESS_MIN_SAMPLES = int(os.getenv('FRESHNESS_MIN_SAMPLES', "5"))
+FRESHNESS_SAMPLES = int(os.getenv('FRESHNESS_SAMPLES', "64"))
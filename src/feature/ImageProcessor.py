@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from src.logger import logger
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+IMAGE_FOLDER = os.path.join('media', 'img')
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def process_image(filename: str, max_side: int, quality: int, image_format: str) -> str:
+    """
+    Уменьшает изображение до max_side по длинной стороне, пережимает и удаляет метаданные.
+    Результат кешируется по хешу содержимого и настроек. Выполняется в дочернем процессе.
+
+    :return: Имя файла для загрузки (исходное, если обработка не уменьшила файл)
+    """
+    source_path = os.path.join(IMAGE_FOLDER, filename)
+    with open(source_path, 'rb') as f:
+        content = f.read()
+
+    digest = hashlib.sha256(content + f"|{max_side}|{quality}|{image_format}".encode()).hexdigest()
+    processed_name = f"processed-{digest[:32]}{FORMAT_EXTENSIONS[image_format]}"
+    processed_path = os.path.join(IMAGE_FOLDER, processed_name)
+    if os.path.exists(processed_path):
+        return processed_name
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        # Метаданные (EXIF, ICC) не передаются в save, поэтому в результат не попадают
+        tmp_path = f"{processed_path}.{os.getpid()}.tmp"
+        try:
+            image.save(tmp_path, format=image_format, quality=quality, optimize=True)
+        except Exception:
+            # Недописанный файл не должен оставаться в media/img
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    if os.path.getsize(tmp_path) >= len(content):
+        os.remove(tmp_path)
+        return filename
+    os.replace(tmp_path, processed_path)
+    return processed_name
+
+
+class ImageProcessor:
+    def __init__(self, enabled=True, max_side=1280, quality=82, image_format="JPEG", workers=2):
+        """
+        Необязательная стадия между скачиванием и загрузкой изображений.
+        Работает в пуле процессов, чтобы не блокировать ввод-вывод; без Pillow файлы передаются как есть.
+
+        :param enabled: Включена ли обработка
+        :param max_side: Максимальный размер длинной стороны в пикселях
+        :param quality: Качество сжатия
+        :param image_format: Формат результата: JPEG или WEBP
+        :param workers: Число процессов пула
+        """
+        if image_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Неподдерживаемый формат изображений: {image_format}")
+        self.enabled = enabled and Image is not None
+        if enabled and Image is None:
+            logger.warning("Pillow не установлен, изображения загружаются без обработки")
+        self.max_side = max_side
+        self.quality = quality
+        self.image_format = image_format
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def process(self, filename: str) -> str:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, process_image, filename, self.max_side, self.quality, self.image_format
+            )
+        except Exception as e:
+            logger.warning("Изображение загружается без обработки", extra={"tags": {
+                "image": filename,
+                "error": str(e)
+            }})
+            return filename
+
+    async def process_many(self, filenames: list[str]) -> list[str]:
+        """
+        Обрабатывает изображения параллельно и возвращает имена файлов для загрузки.
+        """
+        if not self.enabled or not filenames:
+            return filenames
+        processed = await asyncio.gather(*(self.process(filename) for filename in filenames))
+        saved = sum(
+            os.path.getsize(os.path.join(IMAGE_FOLDER, original)) - os.path.getsize(os.path.join(IMAGE_FOLDER, result))
+            for original, result in zip(filenames, processed)
+            if original != result and os.path.exists(os.path.join(IMAGE_FOLDER, original))
+        )
+        logger.debug("Изображения обработаны", extra={"tags": {
+            "images": len(filenames),
+            "saved_bytes": saved
+        }})
+        return list(processed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,130 @@
+import re
+import threading
+from typing import Optional
+
+from src import service
+from src.logger import logger
+
+ACTION_DOWNLOAD = "download"
+ACTION_DEFER = "defer"
+ACTION_SKIP = "skip"
+
+MEDIA_LIMIT_KEYS = {"img": "max_image_bytes", "vid": "max_video_bytes"}
+MEDIA_ALLOW_KEYS = {"img": "images", "vid": "videos"}
+
+
+class MediaBudget:
+    def __init__(self, total_bytes: int):
+        """
+        Бюджет байт медиа на один такт сбора, общий для всех постов.
+        """
+        self.total_bytes = total_bytes
+        self.used_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total_bytes - self.used_bytes)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.used_bytes = 0
+
+    def reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.used_bytes + size > self.total_bytes:
+                return False
+            self.used_bytes += size
+            return True
+
+    def charge(self, size: int) -> None:
+        """
+        Учитывает уже скачанные байты, размер которых не был известен заранее.
+        """
+        with self._lock:
+            self.used_bytes += size
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.used_bytes = max(0, self.used_bytes - size)
+
+
+class MediaPolicy:
+    def __init__(self, name: str, limits: dict, budget: Optional[MediaBudget] = None):
+        """
+        Решает, скачивать ли медиа поста, по его размеру и типу до начала загрузки.
+
+        :param name: Имя политики (для логов)
+        :param limits: Настройки политики: images/videos, max_image_bytes, max_video_bytes, max_post_bytes
+        :param budget: Общий бюджет байт на такт; если не задан, ограничиваются только посты
+        """
+        self.name = name
+        self.limits = limits
+        self.budget = budget
+        self.post_bytes = 0
+
+    def allows(self, media_type: str) -> bool:
+        return bool(self.limits.get(MEDIA_ALLOW_KEYS[media_type], False))
+
+    def max_bytes(self, media_type: str) -> Optional[int]:
+        return self.limits.get(MEDIA_LIMIT_KEYS[media_type])
+
+    @staticmethod
+    def probe(url: str, headers: Optional[dict] = None) -> tuple[Optional[int], Optional[str]]:
+        """
+        Узнает размер и тип файла без скачивания: HEAD, а если сервер его не поддерживает - GET первого байта.
+        """
+        try:
+            response = service.limiter.head(url, headers=headers, timeout=10, allow_redirects=True)
+            if response.ok and response.headers.get("Content-Length"):
+                return int(response.headers["Content-Length"]), response.headers.get("Content-Type")
+
+            response = service.limiter.get(url, headers={**(headers or {}), "Range": "bytes=0-0"}, timeout=10,
+                                           stream=True)
+            try:
+                match = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+                if match:
+                    return int(match.group(1)), response.headers.get("Content-Type")
+                if response.status_code == 200 and response.headers.get("Content-Length"):
+                    return int(response.headers["Content-Length"]), response.headers.get("Content-Type")
+            finally:
+                response.close()
+        except Exception as e:
+            logger.debug("Не удалось узнать размер медиа", extra={"tags": {"url": url, "error": str(e)}})
+        return None, None
+
+    def admit(self, media_type: str, url: str, headers: Optional[dict] = None) -> tuple[str, Optional[int]]:
+        """
+        Решает судьбу файла до загрузки.
+
+        :return: Действие (download, defer или skip) и размер файла, если он известен
+        """
+        if not self.allows(media_type):
+            return ACTION_SKIP, None
+
+        size, content_type = self.probe(url, headers)
+        limit = self.max_bytes(media_type)
+        max_post_bytes = self.limits.get("max_post_bytes")
+        oversized = size is not None and (
+            (limit is not None and size > limit)
+            or (max_post_bytes is not None and self.post_bytes + size > max_post_bytes)
+        )
+        over_budget = size is not None and not oversized and self.budget is not None \
+            and not self.budget.reserve(size)
+
+        if oversized or over_budget:
+            action = ACTION_DEFER if media_type == "vid" or over_budget else ACTION_SKIP
+            logger.info("Медиа не загружается сразу", extra={"tags": {
+                "url": url,
+                "media_type": media_type,
+                "content_type": content_type,
+                "size": size,
+                "policy": self.name,
+                "reason": "budget" if over_budget else "size",
+                "action": action
+            }})
+            return action, size
+
+        if size is not None:
+            self.post_bytes += size
+        return ACTION_DOWNLOAD, size
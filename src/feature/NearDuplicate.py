@@ -0,0 +1,200 @@
+import hashlib
+import re
+import time
+from collections import deque
+from typing import Optional
+
+FINGERPRINT_BITS = 64
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+URL_RE = re.compile(r"(?:https?://|www\.|t\.me/)\S+", re.IGNORECASE)
+TAG_RE = re.compile(r"[@#]\w+", re.UNICODE)
+# Последние строки с упоминанием или ссылкой и не больше FOOTER_MAX_TOKENS слов считаются подписью канала
+FOOTER_MAX_TOKENS = 8
+# Служебные слова и типовые вставки каналов ("Срочно:", "Подписывайтесь") не отличают одну новость от другой
+STOP_WORDS = frozenset("""
+а без бы в во да для до его ее её еще ещё же за и из или их к как ко который которая которые ли на над не ни но
+о об он она они от по под после при с со так также то тоже у уже что это этот эта эти этом
+важно видео источник молния подписаться подписывайтесь подробнее срочно фото
+""".split())
+
+
+def normalize(text: str) -> str:
+    """
+    Убирает из текста то, чем различаются перепосты одной новости в разных каналах:
+    подписи канала, ссылки, упоминания и хештеги.
+    """
+    raw_lines = text.splitlines()
+    lines = [TAG_RE.sub(" ", URL_RE.sub(" ", line)) for line in raw_lines]
+    # Подпись снимается с конца текста; первая строка - начало самой новости и остается всегда
+    while len(lines) > 1:
+        tagged = URL_RE.search(raw_lines[len(lines) - 1]) or TAG_RE.search(raw_lines[len(lines) - 1])
+        if lines[-1].strip() and not (tagged and len(TOKEN_RE.findall(lines[-1])) <= FOOTER_MAX_TOKENS):
+            break
+        lines.pop()
+    return "\n".join(lines)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_RE.findall(normalize(text).lower()) if token not in STOP_WORDS]
+
+
+def token_weight(token: str) -> float:
+    """
+    Вес слова в отпечатке: длинные слова несут больше смысла, а числа часто меняются при перепосте
+    (уточненное число пострадавших, другой формат времени) и весят меньше.
+    """
+    if token.isdigit():
+        return 0.5
+    if len(token) <= 2:
+        return 0.25
+    return min(len(token), 8) / 4
+
+
+def simhash(tokens: list[str], shingle_size: int = 1) -> int:
+    """
+    Вычисляет 64-битный взвешенный SimHash по словам (или шинглам из shingle_size слов).
+    Вес шингла - средний вес его слов. Близкие тексты дают отпечатки с малым расстоянием Хэмминга.
+    """
+    if len(tokens) >= shingle_size:
+        features = [tokens[i:i + shingle_size] for i in range(len(tokens) - shingle_size + 1)]
+    else:
+        features = [tokens]
+
+    weights = [0.0] * FINGERPRINT_BITS
+    for feature in features:
+        weight = sum(token_weight(token) for token in feature) / len(feature)
+        value = int.from_bytes(hashlib.blake2b(" ".join(feature).encode(), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += weight if value >> bit & 1 else -weight
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    def __init__(self, window=21600, max_distance=8, min_tokens=8, redis_conn=None, namespace="dedup"):
+        """
+        Индекс почти-дубликатов за скользящее окно времени на основе SimHash и LSH.
+
+        Отпечаток делится на max_distance + 1 полос: по принципу Дирихле тексты с расстоянием
+        не больше max_distance совпадают хотя бы в одной полосе, поэтому сравниваются только
+        кандидаты из общих полос, а не все новости окна.
+
+        :param window: Размер окна в секундах
+        :param max_distance: Максимальное расстояние Хэмминга для дубликата
+        :param min_tokens: Минимальное число значимых слов, при котором текст индексируется
+        :param redis_conn: Подключение к Redis; если не задано, индекс хранится в памяти процесса
+        :param namespace: Префикс ключей в Redis
+        """
+        self.window = window
+        self.max_distance = max_distance
+        self.min_tokens = min_tokens
+        self.redis_conn = redis_conn
+        self.namespace = namespace
+        self.bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self._band_mask = (1 << self.band_bits) - 1
+        # Хранилище в памяти: ключ полосы -> список (время, отпечаток, ссылка)
+        self._buckets: dict[tuple[int, int], list[tuple[float, int, str]]] = {}
+        self._expiry: deque[tuple[float, list[tuple[int, int]]]] = deque()
+
+    def _band_keys(self, fingerprint: int) -> list[tuple[int, int]]:
+        return [(band, fingerprint >> (band * self.band_bits) & self._band_mask) for band in range(self.bands)]
+
+    @staticmethod
+    def make_ref(channel: str, id_post) -> str:
+        return f"{channel}/{id_post}"
+
+    @staticmethod
+    def parse_ref(ref: str) -> dict:
+        channel, _, id_post = ref.rpartition("/")
+        return {"channel": channel, "id_post": int(id_post)}
+
+    def check_and_add(self, channel: str, id_post, text: str) -> Optional[dict]:
+        """
+        Ищет в окне новость, почти совпадающую с текстом, и добавляет текст в индекс.
+
+        :return: Ссылка на исходную новость {"channel", "id_post"} или None
+        """
+        tokens = tokenize(text or "")
+        if len(tokens) < self.min_tokens:
+            return None
+
+        fingerprint = simhash(tokens)
+        ref = self.make_ref(channel, id_post)
+        now = time.time()
+        band_keys = self._band_keys(fingerprint)
+
+        if self.redis_conn is not None:
+            original = self._redis_check_and_add(band_keys, fingerprint, ref, now)
+        else:
+            original = self._memory_check_and_add(band_keys, fingerprint, ref, now)
+        return self.parse_ref(original) if original else None
+
+    def _best_match(self, candidates, fingerprint: int, ref: str) -> Optional[str]:
+        # Исходной считается самая ранняя близкая новость; при повторной проверке той же новости
+        # учитываются только новости, попавшие в индекс раньше нее
+        own_timestamps = [timestamp for timestamp, _, candidate_ref in candidates if candidate_ref == ref]
+        horizon = min(own_timestamps) if own_timestamps else float("inf")
+        best = None
+        for timestamp, candidate_fp, candidate_ref in candidates:
+            if candidate_ref == ref or timestamp >= horizon:
+                continue
+            if hamming_distance(fingerprint, candidate_fp) <= self.max_distance:
+                if best is None or timestamp < best[0]:
+                    best = (timestamp, candidate_ref)
+        return best[1] if best else None
+
+    def _memory_check_and_add(self, band_keys, fingerprint: int, ref: str, now: float) -> Optional[str]:
+        cutoff = now - self.window
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, expired_keys = self._expiry.popleft()
+            for key in expired_keys:
+                bucket = [entry for entry in self._buckets.get(key, []) if entry[0] >= cutoff]
+                if bucket:
+                    self._buckets[key] = bucket
+                else:
+                    self._buckets.pop(key, None)
+
+        candidates = [entry for key in band_keys for entry in self._buckets.get(key, [])]
+        original = self._best_match(candidates, fingerprint, ref)
+
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append((now, fingerprint, ref))
+        self._expiry.append((now, band_keys))
+        return original
+
+    def _redis_key(self, band_key: tuple[int, int]) -> str:
+        band, value = band_key
+        return f"{self.namespace}:band:{band}:{value:x}"
+
+    def _redis_check_and_add(self, band_keys, fingerprint: int, ref: str, now: float) -> Optional[str]:
+        keys = [self._redis_key(key) for key in band_keys]
+        cutoff = now - self.window
+
+        pipe = self.redis_conn.pipeline()
+        for key in keys:
+            pipe.zrangebyscore(key, cutoff, "+inf", withscores=True)
+        candidates = []
+        for members in pipe.execute():
+            for member, score in members:
+                member = member.decode() if isinstance(member, bytes) else member
+                candidate_fp, _, candidate_ref = member.partition("|")
+                candidates.append((score, int(candidate_fp, 16), candidate_ref))
+        original = self._best_match(candidates, fingerprint, ref)
+
+        member = f"{fingerprint:x}|{ref}"
+        pipe = self.redis_conn.pipeline()
+        for key in keys:
+            pipe.zadd(key, {member: now})
+            pipe.zremrangebyscore(key, "-inf", cutoff)
+            pipe.expire(key, self.window)
+        pipe.execute()
+        return original
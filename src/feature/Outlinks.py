@@ -0,0 +1,262 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit, urljoin, unquote_plus
+
+import requests
+
+from src import service
+from src.logger import logger
+
+# Параметры, которые добавляют рекламные системы и соцсети и которые не влияют на содержимое страницы
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "ysclid", "igshid", "mc_cid", "mc_eid",
+    "_openstat", "_hsenc", "_hsmi", "ref_src", "ref_url", "utm_referrer",
+})
+TELEGRAM_HOSTS = frozenset({"t.me", "telegram.me", "telegram.dog"})
+DEFAULT_PORTS = {"http": 80, "https": 443}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """
+    Приводит ссылку к каноническому виду: схема и хост в нижнем регистре, хост в IDNA без завершающей точки,
+    без порта по умолчанию, фрагмента и трекинговых параметров. Остальные параметры сохраняют порядок
+    и исходное кодирование. Возвращает None для ссылок, которые не являются http(s)-адресами.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except (ValueError, AttributeError):
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.rstrip(".")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    query = "&".join(
+        pair for pair in parts.query.split("&")
+        if pair and not is_tracking_param(unquote_plus(pair.split("=", 1)[0]))
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def url_host(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class OutlinkCache:
+    def __init__(self, max_size=10000, ttl=86400, failure_ttl=3600, redis_conn=None, namespace="outlinks"):
+        """
+        Кеш раскрытых ссылок: LRU в памяти процесса с ограничением размера и временем жизни записей.
+        Если задано подключение к Redis, он служит вторым общим для реплик уровнем.
+
+        :param max_size: Максимальное число записей в памяти
+        :param ttl: Время жизни раскрытой ссылки в секундах
+        :param failure_ttl: Время жизни записи о неудачном раскрытии в секундах
+        :param redis_conn: Подключение к Redis (по умолчанию None - только память процесса)
+        :param namespace: Префикс ключей в Redis
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.failure_ttl = min(failure_ttl, ttl)
+        self.redis_conn = redis_conn
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, url: str, target: str, expires: float) -> None:
+        with self._lock:
+            self._entries[url] = (expires, target)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, urls: Iterable[str]) -> dict[str, str]:
+        """
+        Возвращает известные раскрытия для ссылок. Промахи памяти запрашиваются из Redis одним пайплайном.
+        """
+        found, missing = {}, []
+        now = time.time()
+        with self._lock:
+            for url in urls:
+                entry = self._entries.get(url)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(url)
+                    found[url] = entry[1]
+                else:
+                    self._entries.pop(url, None)
+                    missing.append(url)
+
+        if missing and self.redis_conn is not None:
+            try:
+                pipe = self.redis_conn.pipeline()
+                for url in missing:
+                    pipe.get(f"{self.namespace}:{url}")
+                values = pipe.execute()
+            except Exception as e:
+                logger.warning("Кеш ссылок в Redis недоступен", extra={"tags": {"error": str(e)}})
+                values = []
+            for url, value in zip(missing, values):
+                if value is not None:
+                    target = value.decode() if isinstance(value, bytes) else value
+                    found[url] = target
+                    self._remember(url, target, now + self.failure_ttl)
+        return found
+
+    def set_many(self, resolved: dict[str, Optional[str]]) -> None:
+        """
+        Запоминает раскрытия. None означает неудачу: ссылка остается как есть на failure_ttl секунд.
+        """
+        now = time.time()
+        entries = {}
+        for url, target in resolved.items():
+            ttl = self.ttl if target is not None else self.failure_ttl
+            entries[url] = (target or url, ttl)
+            self._remember(url, target or url, now + ttl)
+
+        if entries and self.redis_conn is not None:
+            try:
+                pipe = self.redis_conn.pipeline()
+                for url, (target, ttl) in entries.items():
+                    pipe.set(f"{self.namespace}:{url}", target, px=ttl * 1000)
+                pipe.execute()
+            except Exception as e:
+                logger.warning("Кеш ссылок в Redis недоступен", extra={"tags": {"error": str(e)}})
+
+
+class OutlinkProcessor:
+    def __init__(self, shorteners=(), cache=None, resolve=True, workers=8, max_redirects=5, timeout=5):
+        """
+        Обработка ссылок из постов: канонизация, удаление ссылок на Telegram, дедупликация внутри поста
+        и раскрытие сокращенных ссылок. Раскрытия выполняются параллельно и кешируются, поэтому
+        повторяющиеся ссылки не требуют запросов.
+
+        :param shorteners: Хосты сервисов сокращения ссылок
+        :param cache: Кеш раскрытий (по умолчанию OutlinkCache в памяти)
+        :param resolve: Раскрывать ли сокращенные ссылки
+        :param workers: Число потоков для раскрытия
+        :param max_redirects: Максимальная длина цепочки перенаправлений
+        :param timeout: Таймаут одного запроса в секундах
+        """
+        self.shorteners = frozenset(host.lower() for host in shorteners)
+        self.cache = cache if cache is not None else OutlinkCache()
+        self.resolve_enabled = resolve
+        self.workers = workers
+        self.max_redirects = max_redirects
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outlinks")
+        return self._executor
+
+    def is_shortener(self, url: str) -> bool:
+        return url_host(url) in self.shorteners
+
+    @staticmethod
+    def canonicalize(outlinks: Iterable[str]) -> list[str]:
+        """
+        Канонизирует ссылки поста, убирает ссылки на Telegram и повторы с сохранением порядка.
+        """
+        links = {}
+        for url in outlinks:
+            canonical = canonicalize_url(url) if isinstance(url, str) else None
+            if canonical and url_host(canonical) not in TELEGRAM_HOSTS:
+                links[canonical] = None
+        return list(links)
+
+    def resolve(self, url: str) -> Optional[str]:
+        """
+        Проходит по цепочке перенаправлений, пока адрес принадлежит сокращателю.
+        Целевой сайт не запрашивается. Возвращает каноническую ссылку назначения или None при ошибке.
+        """
+        current = url
+        for _ in range(self.max_redirects):
+            response = service.limiter.head(current, allow_redirects=False, timeout=self.timeout)
+            if response.status_code in (403, 405, 501):
+                # Часть сокращателей не поддерживает HEAD - повторяем GET без чтения тела
+                response.close()
+                response = service.limiter.get(current, allow_redirects=False, timeout=self.timeout, stream=True)
+            response.close()
+            location = response.headers.get("Location")
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                return canonicalize_url(current) if current != url else None
+            current = urljoin(current, location)
+            if not self.is_shortener(current):
+                return canonicalize_url(current)
+        return canonicalize_url(current)
+
+    def _resolve_safe(self, url: str) -> Optional[str]:
+        try:
+            return self.resolve(url)
+        except requests.exceptions.RequestException as e:
+            logger.debug("Не удалось раскрыть ссылку", extra={"tags": {"url": url, "error": str(e)}})
+            return None
+
+    def resolve_many(self, urls: Iterable[str]) -> dict[str, str]:
+        """
+        Раскрывает сокращенные ссылки: известные берутся из кеша, остальные запрашиваются параллельно.
+        """
+        urls = list(dict.fromkeys(urls))
+        resolved = self.cache.get_many(urls)
+        missing = [url for url in urls if url not in resolved]
+        if missing:
+            fetched = dict(zip(missing, self.executor.map(self._resolve_safe, missing)))
+            self.cache.set_many(fetched)
+            resolved.update((url, target or url) for url, target in fetched.items())
+            logger.debug("Ссылки раскрыты", extra={"tags": {
+                "requested": len(missing),
+                "cached": len(urls) - len(missing),
+                "failed": sum(target is None for target in fetched.values())
+            }})
+        return resolved
+
+    def process_many(self, payloads: list[dict]) -> None:
+        """
+        Обрабатывает поле outlinks у пачки новостей на месте. Сокращенные ссылки всех новостей
+        раскрываются одним параллельным проходом.
+        """
+        for payload in payloads:
+            payload["outlinks"] = self.canonicalize(payload.get("outlinks") or [])
+        if not self.resolve_enabled or not self.shorteners:
+            return
+
+        short = [url for payload in payloads for url in payload["outlinks"] if self.is_shortener(url)]
+        if not short:
+            return
+        resolved = self.resolve_many(short)
+        for payload in payloads:
+            if any(url in resolved for url in payload["outlinks"]):
+                payload["outlinks"] = self.canonicalize(resolved.get(url, url) for url in payload["outlinks"])
+
+    def process(self, outlinks: list[str]) -> list[str]:
+        payload = {"outlinks": outlinks}
+        self.process_many([payload])
+        return payload["outlinks"]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
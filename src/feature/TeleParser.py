@@ -1,23 +1,31 @@
 import os
 import uuid
 import requests
-import html2text
 import re
-from bs4 import BeautifulSoup
 import time
 
+from src import service
+from src.feature.MediaPolicy import MediaPolicy, ACTION_DOWNLOAD, ACTION_DEFER
+from src.feature.TelegramParser import resolve_telegram_url
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
 class TeleScraperDict:
-    def __init__(self, post_url):
+    def __init__(self, post_url, media_policy: MediaPolicy = None):
         self.post_url = post_url
+        self.media_policy = media_policy  # Политика загрузки медиа (None - скачивать все)
         self.headers = {
             'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.90 Safari/537.36 TelegramBot (like TwitterBot)'
         }
         self.image_filenames = []  # Список для сохраненных имен файлов изображений
         self.video_filenames = []  # Список для сохраненных имен файлов видео
+        self.deferred_media = []  # Медиа, отложенные политикой для фоновой загрузки
         self.author = ""  # Автор сообщения
         self.content = ""  # Содержимое сообщения
         self.date_time = ""  # Время публикации сообщения
-        self.media_download_delay = 1  # Добавляем задержку в секундах между загрузками
         self.max_retries = 3  # Максимальное количество попыток скачивания
         self.retry_delay = 2  # Задержка между попытками в секундах
 
@@ -26,6 +34,8 @@ class TeleScraperDict:
         """
         Преобразует HTML в текст, игнорируя ссылки, изображения и форматирование.
         """
+        import html2text
+
         h = html2text.HTML2Text()
         h.body_width = 0
         h.ignore_links = True
@@ -42,7 +52,7 @@ class TeleScraperDict:
         text = re.sub(r'^[ \t]*[\\`]', '', text, flags=re.MULTILINE)
         return text
 
-    def save_media(self, url, media_type):
+    def save_media(self, url, media_type, max_bytes=None):
         folder_name = "media"
 
         # Создаем папки для медиа, если их нет
@@ -77,14 +87,26 @@ class TeleScraperDict:
 
         for attempt in range(self.max_retries):
             try:
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.raise_for_status()
-                
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                time.sleep(self.media_download_delay)
+                # Темп загрузок задает общий ограничитель частоты по хосту CDN
+                response = service.limiter.get(url, headers=self.headers, timeout=10, stream=True)
+                try:
+                    response.raise_for_status()
+                    written = 0
+                    with open(file_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            written += len(chunk)
+                            # Сервер мог не сообщить размер заранее - прерываем загрузку сверх лимита
+                            if max_bytes is not None and written > max_bytes:
+                                raise MediaTooLarge(f"{url} больше {max_bytes} байт")
+                            f.write(chunk)
+                finally:
+                    response.close()
                 return filename
-                
+
+            except MediaTooLarge as e:
+                print(f"Download aborted: {e}")
+                os.remove(file_path)
+                return None
             except requests.exceptions.RequestException as e:
                 print(f"Attempt {attempt + 1}/{self.max_retries} failed to download {url}: {e}")
                 if attempt < self.max_retries - 1:
@@ -112,7 +134,7 @@ class TeleScraperDict:
                         image_url = match
 
                         if image_url:
-                            filename = self.save_media(image_url, 'img')
+                            filename = self.download(image_url, 'img')
                             if filename:
                                 self.image_filenames.append(filename)
                             else:
@@ -129,18 +151,55 @@ class TeleScraperDict:
                 if video_tag:
                     src = video_tag.get('src')
                     if src:
-                        filename = self.save_media(src, 'vid')
+                        filename = self.download(src, 'vid')
                         if filename:
                             self.video_filenames.append(filename)
+                        elif self.media_policy is not None:
+                            # Видео отложено или запрещено - вместо него сохраняем постер
+                            self.append_video_thumb(video)
+
+    def append_video_thumb(self, video):
+        thumb = video.find('i', {'class': 'tgme_widget_message_video_thumb'})
+        matches = re.findall(r"background-image:url\('(.*?)'\)", thumb.get('style', '')) if thumb else []
+        for match in matches:
+            filename = self.download(match, 'img')
+            if filename:
+                self.image_filenames.append(filename)
+
+    def download(self, url, media_type):
+        """
+        Скачивает медиа с учетом политики: крупные файлы откладываются в deferred_media, запрещенные пропускаются.
+        """
+        if self.media_policy is None:
+            return self.save_media(url, media_type)
+
+        action, size = self.media_policy.admit(media_type, url, self.headers)
+        if action == ACTION_DEFER:
+            self.deferred_media.append({"url": url, "type": media_type, "size": size})
+        if action != ACTION_DOWNLOAD:
+            return None
+
+        filename = self.save_media(url, media_type, max_bytes=self.media_policy.max_bytes(media_type))
+        budget = self.media_policy.budget
+        if budget is not None:
+            if filename is None and size is not None:
+                budget.release(size)
+            elif filename is not None and size is None:
+                folder = 'img' if media_type == 'img' else 'video'
+                budget.charge(os.path.getsize(os.path.join('media', folder, filename)))
+        return filename
 
     async def fetch_data(self):
         """
         Скачивает данные с поста по его URL.
         """
-        url = self.post_url + '?embed=1&mode=tme'
+        from bs4 import BeautifulSoup
+
+        url = resolve_telegram_url(self.post_url) + '?embed=1&mode=tme'
+        link_html = None
         try:
             # Запрос и парсинг HTML
-            response = requests.get(url, headers=self.headers)
+            response = service.http_cache.fetch(url, "telegram_post", headers=self.headers, timeout=10)
             response.raise_for_status()
             link_html = BeautifulSoup(response.text, 'html.parser')
 
@@ -167,6 +226,10 @@ class TeleScraperDict:
 
         except requests.exceptions.RequestException as err:
             print(f"Request failed: {err}")
+        finally:
+            # Дерево разбора содержит циклические ссылки - освобождаем его сразу, не дожидаясь сборщика мусора
+            if link_html is not None:
+                link_html.decompose()
 
     async def get(self):
         """
@@ -178,5 +241,6 @@ class TeleScraperDict:
             "content": self.content,
             "date_time": self.date_time,
             "images": self.image_filenames,
-            "videos": self.video_filenames
+            "videos": self.video_filenames,
+            "deferred": self.deferred_media
         }
\ No newline at end of file
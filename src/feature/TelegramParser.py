@@ -1,6 +1,20 @@
-import json
 import subprocess
 from typing import List, Dict
+from urllib.parse import urljoin
+
+from src import serialization, service
+from src.conf import TELEGRAM_BASE_URL
+
+TELEGRAM_URL = "https://t.me"
+
+
+def resolve_telegram_url(url: str) -> str:
+    """
+    Переписывает ссылку t.me на адрес, с которого реально скачиваются страницы (TELEGRAM_BASE_URL).
+    """
+    if TELEGRAM_BASE_URL != TELEGRAM_URL and url.startswith(TELEGRAM_URL):
+        return TELEGRAM_BASE_URL + url[len(TELEGRAM_URL):]
+    return url
 
 
 class TelegramParser:
@@ -22,13 +36,15 @@ class TelegramParser:
         Преобразует строку в формате JSON в Python-объект.
         """
         json_lines = data.strip().split('\n')
-        posts: List[Dict] = [json.loads(line) for line in json_lines if line]
+        posts: List[Dict] = [serialization.loads(line) for line in json_lines if line]
         return posts
 
     def subprocess_run(self, channel_url: str) -> str:
         """
         Выполняет команду для получения данных о последнем контенте с канала.
         """
+        # snscrape ходит на t.me сам, поэтому заранее занимаем токен этого хоста
+        service.limiter.acquire("t.me")
         try:
             result = subprocess.run(
                 [
@@ -53,5 +69,45 @@ class TelegramLastNews(TelegramParser):
         """
         Получает последние новости с канала и возвращает их как Python-объекты.
         """
-        data_last_news = self.subprocess_run(channel_url=telegram_channel)
-        return self.upgrade_to_json(data_last_news)
+        data_last_news = service.http_cache.remember(
+            f"{self.library}:{self.type_channel}:{telegram_channel}",
+            "channel",
+            lambda: self.subprocess_run(channel_url=telegram_channel).encode()
+        )
+        return self.upgrade_to_json(data_last_news.decode())
+
+
+class TelegramWebLastNews(TelegramParser):
+    def get(self, telegram_channel: str) -> List[Dict]:
+        """
+        Получает последние новости канала разбором страницы t.me/s/<канал> без запуска snscrape.
+        Возвращает записи в том же формате, что и snscrape: url, date, content, outlinks.
+        """
+        from bs4 import BeautifulSoup
+
+        page_url = f"{TELEGRAM_URL}/s/{telegram_channel}"
+        response = service.http_cache.fetch(resolve_telegram_url(page_url), "channel", timeout=10)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, 'html.parser')
+
+        posts = []
+        for post in reversed(soup.find_all('div', attrs={'class': 'tgme_widget_message', 'data-post': True})):
+            url = f"{TELEGRAM_URL}/s/{post['data-post']}"
+            time_tag = post.find('time', datetime=True)
+            message = post.find('div', class_='tgme_widget_message_text')
+            outlinks = []
+            if message:
+                for link in message.find_all('a', href=True):
+                    href = urljoin(page_url, link['href'])
+                    if href not in outlinks:
+                        outlinks.append(href)
+            posts.append({
+                "url": url,
+                "date": time_tag['datetime'] if time_tag else None,
+                "content": message.text if message else None,
+                "outlinks": outlinks
+            })
+            if len(posts) >= int(self.max_results):
+                break
+        soup.decompose()
+        return posts
@@ -1,33 +1,16 @@
 import os
 import uuid
 import hashlib
-import requests
-import feedparser
 from urllib.parse import urlparse
-from newspaper import Article, build
-from typing import List, Dict
-
-news_sites = [
-    "https://news.sky.com",
-    "https://www.nytimes.com",
-    "https://www.euronews.com/just-in",
-    "https://www.theguardian.com/us-news",
-    "https://newizv.ru/news",
-    "https://www.bbc.com/news",
-]
-
-rss_map = {
-    "https://news.sky.com": "https://feeds.skynews.com/feeds/rss/home.xml",
-    "https://www.nytimes.com": "https://rss.nytimes.com/services/xml/rss/nyt/HomePage.xml",
-    "https://www.euronews.com/just-in": "https://www.euronews.com/rss?level=theme&name=just_in",
-    "https://www.theguardian.com/us-news": "https://www.theguardian.com/us-news/rss",
-    "https://newizv.ru/news": "https://newizv.ru/rss",
-    "https://www.bbc.com/news": "https://feeds.bbci.co.uk/news/rss.xml"
-}
+from typing import List, Dict, Optional
+
+from src import service
+
 class NewsParser:
-    def __init__(self, sites: List[str] = news_sites, media_dir: str = "./media"):
+    def __init__(self, sites: List[str], media_dir: str = "./media", rss_map: Optional[Dict[str, str]] = None):
         self.sites = sites
         self.media_dir = media_dir
+        self.rss_map = rss_map or {}
 
         # Структура папок для медиа
         self.img_folder = os.path.join(self.media_dir, 'img')
@@ -39,8 +22,12 @@ class NewsParser:
         return int(numeric_part[:length] or '0')
 
     def get_latest_rss_url(self, rss_url: str) -> str:
+        import feedparser
+
         try:
-            feed = feedparser.parse(rss_url)
+            response = service.http_cache.fetch(rss_url, "rss", timeout=10)
+            response.raise_for_status()
+            feed = feedparser.parse(response.content)
             if feed.entries:
                 return feed.entries[0].link
             else:
@@ -51,7 +38,7 @@ class NewsParser:
             return ""
 
     def get_latest_article_url(self, site_url: str) -> str:
-        rss_url = rss_map.get(site_url)
+        rss_url = self.rss_map.get(site_url)
         if rss_url:
             print(f"Используем RSS для {site_url}")
             article_url = self.get_latest_rss_url(rss_url)
@@ -59,7 +46,11 @@ class NewsParser:
                 return article_url
 
         print(f"Fallback на newspaper3k для {site_url}")
+        from newspaper import build
+
         try:
+            # newspaper3k скачивает страницы сам, поэтому токен хоста занимаем заранее
+            service.limiter.acquire(urlparse(site_url).hostname or "")
             source = build(site_url, memoize_articles=False)
             if source.articles:
                 return source.articles[0].url
@@ -83,7 +74,7 @@ class NewsParser:
 
             file_path = os.path.join(folder, filename)
 
-            response = requests.get(url, timeout=10)
+            response = service.limiter.get(url, timeout=10)
             response.raise_for_status()
             with open(file_path, 'wb') as f:
                 f.write(response.content)
@@ -94,9 +85,17 @@ class NewsParser:
             return None
 
     def parse_article(self, url: str, download_media: bool = True) -> Dict[str, str]:
+        from newspaper import Article, Config
+
         try:
-            article = Article(url)
-            article.download()
+            # Заголовки те же, что отправил бы сам newspaper3k: часть сайтов отдает другую страницу без них
+            config = Config()
+            response = service.http_cache.fetch(url, "article", headers={"User-Agent": config.browser_user_agent},
+                                                timeout=10)
+            response.raise_for_status()
+            article = Article(url, config=config)
+            # Без charset в заголовке байты декодирует newspaper3k по meta charset страницы
+            article.download(input_html=response.text if response.encoding else response.content)
             article.parse()
 
             top_image_url = article.top_image if article.top_image else None
@@ -134,5 +133,6 @@ class NewsParser:
             if latest_url:
                 article_data = self.parse_article(latest_url)
                 if article_data:
+                    article_data["site"] = site
                     latest_articles.append(article_data)
         return latest_articles
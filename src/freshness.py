@@ -0,0 +1,107 @@
+"""
+Свежесть новостей: время от публикации записи в источнике до ее постановки в очередь filter.
+
+Payload записи несет published_at (время публикации, Unix-время) и stages - время прохождения
+стадий конвейера (fetched, created, uploaded, enqueued). При постановке в очередь задержки
+попадают в гистограммы по источникам; источники, у которых перцентиль задержки выше цели, помечаются медленными.
+"""
+import time
+from datetime import datetime
+from typing import Optional
+
+from src.logger import logger
+
+# Стадии created и uploaded - это стадии outbox (STAGE_CREATED, STAGE_UPLOADED), fetched и enqueued - его вход и выход
+STAGE_FETCHED = "fetched"
+STAGE_ENQUEUED = "enqueued"
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """
+    Преобразует время публикации (ISO 8601 из ленты канала, строку или datetime статьи) в Unix-время.
+    Время без часового пояса считается локальным. Возвращает None, если разобрать значение не удалось.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return None
+
+
+def stamp(payload: dict, stage: str, now: Optional[float] = None) -> None:
+    """
+    Отмечает в payload время прохождения стадии.
+    """
+    payload.setdefault("stages", {})[stage] = time.time() if now is None else now
+
+
+class FreshnessTracker:
+    def __init__(self, metrics, slo=600, percentile=95, min_samples=5, reservoir=64):
+        """
+        Собирает задержки свежести в гистограммы Metrics и находит медленные источники.
+
+        :param metrics: Реестр метрик
+        :param slo: Цель по задержке от публикации до очереди в секундах
+        :param percentile: Перцентиль задержки, который сравнивается с целью
+        :param min_samples: Минимальное число записей источника для оценки
+        :param reservoir: Сколько последних задержек источника хранится для перцентилей
+        """
+        self.metrics = metrics
+        self.slo = slo
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.reservoir = reservoir
+
+    def observe(self, source: str, payload: dict) -> None:
+        """
+        Учитывает запись, поставленную в очередь: полную задержку по источнику, а по всем источникам
+        вместе - задержку обнаружения (публикация - получение) и обработки (получение - очередь).
+        """
+        published_at = payload.get("published_at")
+        stages = payload.get("stages") or {}
+        enqueued_at = stages.get(STAGE_ENQUEUED)
+        if published_at is None or enqueued_at is None:
+            return
+        lag = max(0.0, enqueued_at - published_at)
+        self.metrics.observe("freshness_lag", lag, reservoir=self.reservoir, source=source)
+        self.metrics.observe("freshness_lag_total", lag, reservoir=1024)
+        fetched_at = stages.get(STAGE_FETCHED)
+        if fetched_at is not None:
+            self.metrics.observe("freshness_detect_lag", max(0.0, fetched_at - published_at), reservoir=1024)
+            self.metrics.observe("freshness_pipeline_lag", max(0.0, enqueued_at - fetched_at), reservoir=1024)
+
+    def slow_sources(self) -> list[tuple[str, float]]:
+        """
+        Источники, у которых перцентиль задержки превышает цель, от самых медленных.
+        """
+        slow = []
+        for labels, histogram in self.metrics.histograms("freshness_lag"):
+            if len(histogram.samples) < self.min_samples:
+                continue
+            value = histogram.percentile(self.percentile)
+            if value is not None and value > self.slo:
+                slow.append((labels["source"], value))
+        slow.sort(key=lambda item: -item[1])
+        return slow
+
+    def report(self, limit: int = 20) -> list[tuple[str, float]]:
+        """
+        Обновляет метрику числа медленных источников и записывает в лог самые медленные из них.
+        """
+        slow = self.slow_sources()
+        self.metrics.set_gauge("freshness_slow_sources", len(slow))
+        if slow:
+            logger.warning("Источники не укладываются в цель по свежести", extra={"tags": {
+                "operation": "freshness"
+            }, "fields": {
+                "slo": self.slo,
+                "percentile": self.percentile,
+                "slow_sources": len(slow),
+                "slowest": {source: round(value, 1) for source, value in slow[:limit]}
+            }})
+        return slow
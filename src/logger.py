@@ -1,8 +1,6 @@
-import json
 import logging
 
-import requests
-
+from src import serialization
 from src.service_url import get_url_loki
 
 
@@ -11,6 +9,16 @@ class LokiHandler(logging.Handler):
         super().__init__()
         self.url = url
         self.base_tags = tags
+        self._session = None
+
+    @property
+    def session(self):
+        # requests и HTTP-сессия создаются при первой отправке записи, а не при импорте логгера
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+        return self._session
 
     def emit(self, record):
         try:
@@ -29,6 +37,9 @@ class LokiHandler(logging.Handler):
                     numeric_fields[key] = value
                     tags[key] = str(value)
 
+            # Поля попадают только в строку записи и, в отличие от тегов, не создают новых потоков Loki
+            fields = getattr(record, 'fields', {})
+
             log_entry = self.format(record)
             
             payload = {
@@ -38,10 +49,11 @@ class LokiHandler(logging.Handler):
                         "values": [
                             [
                                 str(int(record.created * 1e9)),
-                                json.dumps({
+                                serialization.dumps_str({
                                     "message": log_entry,
-                                    **numeric_fields
-                                }, ensure_ascii=False)
+                                    **numeric_fields,
+                                    **fields
+                                })
                             ]
                         ]
                     }
@@ -49,7 +61,7 @@ class LokiHandler(logging.Handler):
             }
             
             headers = {'Content-Type': 'application/json'}
-            response = requests.post(self.url, data=json.dumps(payload), headers=headers)
+            response = self.session.post(self.url, data=serialization.dumps(payload), headers=headers)
             response.raise_for_status()
         except Exception as e:
             print(f"Loki logging error: {str(e)}")
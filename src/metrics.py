@@ -0,0 +1,140 @@
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+from src.logger import logger
+
+# Границы корзин гистограмм задержек в секундах
+LATENCY_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 21600, 86400)
+# Метки метрик, которые при выгрузке становятся метками потока Loki (вместе с именем метрики)
+EXPORT_LABELS = ("source",)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "total", "samples", "reservoir", "_next")
+
+    def __init__(self, buckets=LATENCY_BUCKETS, reservoir=64):
+        """
+        Гистограмма с фиксированными корзинами за все время и кольцевым буфером последних
+        reservoir значений для перцентилей. Буфер хранится в array, поэтому тысячи гистограмм
+        по источникам занимают немного памяти.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.samples = array("d")
+        self.reservoir = reservoir
+        self._next = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if len(self.samples) < self.reservoir:
+            self.samples.append(value)
+        else:
+            self.samples[self._next] = value
+            self._next = (self._next + 1) % self.reservoir
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Перцентиль q (0-100) по последним значениям.
+        """
+        if not self.samples:
+            return None
+        values = sorted(self.samples)
+        return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+    def bucket_counts(self) -> dict[str, int]:
+        """
+        Накопленные счетчики корзин: le_N - число значений не больше N секунд.
+        """
+        labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+        cumulative, total = [], 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return dict(zip(labels, cumulative))
+
+
+class Metrics:
+    def __init__(self, project="TelegramParser"):
+        """
+        Реестр метрик процесса. Значения периодически выгружаются в Loki
+        как числовые поля записей с operation=metric.
+        """
+        self.project = project
+        self._lock = threading.Lock()
+        self._gauges: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+        self._updated: set[tuple] = set()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, *sorted(labels.items()))
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def get_gauge(self, name: str, **labels):
+        return self._gauges.get(self._key(name, labels))
+
+    def observe(self, name: str, value: float, reservoir: int = 64, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(reservoir=reservoir)
+            histogram.observe(value)
+            self._updated.add(key)
+
+    def get_histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get(self._key(name, labels))
+
+    def histograms(self, name: str) -> list[tuple[dict, Histogram]]:
+        """
+        Возвращает все гистограммы метрики с их метками.
+        """
+        with self._lock:
+            return [(dict(labels), histogram) for (key_name, *labels), histogram in self._histograms.items()
+                    if key_name == name]
+
+    @staticmethod
+    def _split_labels(name: str, labels: list[tuple[str, str]]) -> tuple[dict, dict]:
+        tags = {"metric": name}
+        fields = {"operation": "metric"}
+        for key, value in labels:
+            (tags if key in EXPORT_LABELS else fields)[key] = value
+        return tags, fields
+
+    def export(self) -> None:
+        """
+        Записывает текущие значения метрик в лог. Гистограммы выгружаются, только если
+        с прошлой выгрузки в них появились значения.
+        Метками потока Loki становятся только имя метрики и источник (EXPORT_LABELS), значения
+        и остальные метки передаются числовыми полями записи, чтобы не плодить потоки.
+        """
+        with self._lock:
+            gauges = list(self._gauges.items())
+            updated = [(key, self._histograms[key]) for key in self._updated]
+            self._updated.clear()
+        for (name, *labels), value in gauges:
+            tags, fields = self._split_labels(name, labels)
+            logger.info(f"metric {name}", extra={"tags": tags, "fields": {
+                **fields,
+                "value": value
+            }})
+        for (name, *labels), histogram in updated:
+            tags, fields = self._split_labels(name, labels)
+            logger.info(f"metric {name}", extra={"tags": tags, "fields": {
+                **fields,
+                "count": histogram.count,
+                "sum": round(histogram.total, 3),
+                "p50": histogram.percentile(50),
+                "p95": histogram.percentile(95),
+                "p99": histogram.percentile(99),
+                **histogram.bucket_counts()
+            }})
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from src import serialization
+
+STAGE_NEW = "new"
+STAGE_CREATED = "created"
+STAGE_UPLOADED = "uploaded"
+
+
+class Outbox:
+    def __init__(self, path, max_attempts=5):
+        """
+        Журнал (write-ahead outbox) обработки новостей на локальном диске.
+
+        Каждая новость проходит стадии new -> created -> uploaded и удаляется после постановки в очередь.
+        Незавершенные записи переживают падение процесса и дочищаются при следующем запуске.
+
+        :param path: Путь к файлу SQLite
+        :param max_attempts: Число неудачных попыток, после которого запись перестает выбираться (dead letter)
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                channel TEXT NOT NULL,
+                id_post INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (channel, id_post)
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_stage ON outbox (stage, attempts, created_at)")
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Транзакция под блокировкой. При ошибке откатывается, чтобы следующий BEGIN не упал
+        на незакрытой транзакции.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def add(self, channel: str, id_post: int, payload: dict, stage: str = STAGE_NEW) -> bool:
+        """
+        Регистрирует новость в outbox. Возвращает False, если она уже отслеживается.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (channel, id_post, stage, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (channel, id_post, stage, serialization.dumps_str(payload), now, now)
+            )
+        return cursor.rowcount > 0
+
+    def contains(self, channel: str, id_post: int) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM outbox WHERE channel = ? AND id_post = ?", (channel, id_post)
+            ).fetchone()
+        return row is not None
+
+    def pending(self, stage: str, limit: int) -> list[dict]:
+        """
+        Возвращает пачку записей на указанной стадии в порядке поступления.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT channel, id_post, payload, attempts FROM outbox "
+                "WHERE stage = ? AND attempts < ? ORDER BY created_at LIMIT ?",
+                (stage, self.max_attempts, limit)
+            ).fetchall()
+        return [
+            {"channel": channel, "id_post": id_post, "payload": serialization.loads(payload), "attempts": attempts}
+            for channel, id_post, payload, attempts in rows
+        ]
+
+    def dead_letters(self, limit: int) -> list[dict]:
+        """
+        Возвращает записи, исчерпавшие попытки (dead letters), начиная с давно не обновлявшихся.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT channel, id_post, stage, payload, attempts, updated_at FROM outbox "
+                "WHERE attempts >= ? ORDER BY updated_at LIMIT ?",
+                (self.max_attempts, limit)
+            ).fetchall()
+        return [
+            {"channel": channel, "id_post": id_post, "stage": stage, "payload": serialization.loads(payload),
+             "attempts": attempts, "updated_at": updated_at}
+            for channel, id_post, stage, payload, attempts, updated_at in rows
+        ]
+
+    def retry(self, item: dict) -> None:
+        """
+        Возвращает запись в обработку: сбрасывает счетчик попыток, сохраняя payload.
+        """
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET attempts = 0, payload = ?, updated_at = ? WHERE channel = ? AND id_post = ?",
+                (serialization.dumps_str(item["payload"]), time.time(), item["channel"], item["id_post"])
+            )
+        item["attempts"] = 0
+
+    def advance(self, items: list[dict], stage: str) -> None:
+        """
+        Переводит записи на следующую стадию, сохраняя обновленный payload и сбрасывая счетчик попыток.
+        """
+        now = time.time()
+        rows = [(stage, serialization.dumps_str(item["payload"]), now, item["channel"], item["id_post"])
+                for item in items]
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE outbox SET stage = ?, payload = ?, attempts = 0, updated_at = ? "
+                "WHERE channel = ? AND id_post = ?",
+                rows
+            )
+
+    def fail(self, item: dict) -> int:
+        """
+        Увеличивает счетчик неудачных попыток, сохраняя payload с уже полученными данными,
+        и возвращает новое значение счетчика.
+        """
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, payload = ?, updated_at = ? WHERE channel = ? AND id_post = ?",
+                (serialization.dumps_str(item["payload"]), time.time(), item["channel"], item["id_post"])
+            )
+        item["attempts"] += 1
+        return item["attempts"]
+
+    def save(self, item: dict) -> None:
+        """
+        Сохраняет payload записи без изменения стадии и счетчика попыток.
+        """
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET payload = ?, updated_at = ? WHERE channel = ? AND id_post = ?",
+                (serialization.dumps_str(item["payload"]), time.time(), item["channel"], item["id_post"])
+            )
+
+    def complete(self, items: list[dict]) -> None:
+        """
+        Удаляет полностью обработанные записи.
+        """
+        rows = [(item["channel"], item["id_post"]) for item in items]
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM outbox WHERE channel = ? AND id_post = ?", rows)
+
+    def counts(self) -> dict:
+        """
+        Возвращает число записей на каждой стадии.
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT stage, COUNT(*) FROM outbox GROUP BY stage").fetchall()
+        return dict(rows)
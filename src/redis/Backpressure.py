@@ -0,0 +1,78 @@
+import time
+
+from src.logger import logger
+
+STATE_NORMAL = "normal"
+STATE_THROTTLED = "throttled"
+STATE_PAUSED = "paused"
+
+
+class QueueBackpressure:
+    def __init__(self, queue, high_water, low_water, max_depth, metrics=None, check_interval=5.0):
+        """
+        Следит за глубиной очереди и переключает режим сбора с гистерезисом.
+
+        normal - работаем в полную силу; throttled - очередь выше high_water, низкоприоритетные
+        источники откладываются; paused - очередь выше max_depth, постановка в очередь
+        приостанавливается (новости ждут в outbox). Возврат в normal - только ниже low_water.
+
+        :param queue: RedisQueue, в которую пишет сервис
+        :param high_water: Глубина, начиная с которой сбор замедляется
+        :param low_water: Глубина, ниже которой сбор возобновляется
+        :param max_depth: Глубина, начиная с которой постановка в очередь приостанавливается
+        :param metrics: Реестр метрик для публикации глубины очереди
+        :param check_interval: Как долго в секундах использовать последнее измерение
+        """
+        self.queue = queue
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_depth = max_depth
+        self.metrics = metrics
+        self.check_interval = check_interval
+        self.state = STATE_NORMAL
+        self.depth = 0
+        self._checked_at = 0.0
+
+    def update(self, force: bool = False) -> str:
+        """
+        Измеряет глубину очереди (не чаще check_interval) и возвращает текущий режим.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return self.state
+        self._checked_at = now
+
+        try:
+            self.depth = self.queue.depth()
+        except Exception as e:
+            logger.warning("Не удалось измерить глубину очереди", extra={"tags": {"error": str(e)}})
+            return self.state
+
+        previous = self.state
+        if self.depth >= self.max_depth:
+            self.state = STATE_PAUSED
+        elif self.depth >= self.high_water:
+            self.state = STATE_THROTTLED
+        elif self.depth <= self.low_water:
+            self.state = STATE_NORMAL
+        elif self.state == STATE_PAUSED:
+            self.state = STATE_THROTTLED
+
+        if self.metrics is not None:
+            self.metrics.set_gauge("queue_depth", self.depth, queue=self.queue.queue_name)
+        if self.state != previous:
+            logger.warning("Режим обратного давления изменен", extra={"tags": {
+                "queue": self.queue.queue_name,
+                "queue_depth": self.depth,
+                "previous_state": previous,
+                "state": self.state
+            }})
+        return self.state
+
+    @property
+    def throttled(self) -> bool:
+        return self.update() != STATE_NORMAL
+
+    @property
+    def paused(self) -> bool:
+        return self.update() == STATE_PAUSED
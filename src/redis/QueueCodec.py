@@ -0,0 +1,104 @@
+import zlib
+
+from src import serialization
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Заголовок версии 1: старший бит 0x80, биты 4-5 - сжатие, биты 0-3 - формат.
+# Обычный JSON начинается с ASCII-символа, поэтому элементы без заголовка распознаются однозначно.
+HEADER_MARK = 0x80
+FORMAT_MASK = 0x0F
+COMPRESSION_MASK = 0x30
+
+FORMAT_JSON = 0x01
+FORMAT_MSGPACK = 0x02
+
+COMPRESSION_NONE = 0x00
+COMPRESSION_ZLIB = 0x10
+COMPRESSION_ZSTD = 0x20
+
+FORMATS = {"json": FORMAT_JSON, "msgpack": FORMAT_MSGPACK}
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+
+class QueueCodec:
+    def __init__(self, codec="json-plain", compression="none", compress_threshold=1024):
+        """
+        Кодирует элементы очереди в компактный бинарный вид и декодирует любой поддерживаемый формат.
+
+        :param codec: json-plain - JSON без заголовка; json или msgpack - с байтом-заголовком
+        :param compression: none, zlib или zstd (только для форматов с заголовком)
+        :param compress_threshold: Минимальный размер в байтах, начиная с которого данные сжимаются
+        """
+        if codec not in FORMATS and codec != "json-plain":
+            raise ValueError(f"Неизвестный формат очереди: {codec}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Неизвестное сжатие очереди: {compression}")
+        if codec == "msgpack" and msgpack is None:
+            raise ImportError("Для формата msgpack нужен пакет msgpack")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("Для сжатия zstd нужен пакет zstandard")
+
+        self.codec = codec
+        self.compression = COMPRESSIONS[compression]
+        self.compress_threshold = compress_threshold
+        self._zstd_compressor = zstandard.ZstdCompressor() if zstandard is not None else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def encode(self, data) -> bytes:
+        """
+        Кодирует объект в байты для записи в Redis.
+        """
+        if self.codec == "json-plain":
+            return serialization.dumps(data)
+
+        if self.codec == "msgpack":
+            body = msgpack.packb(data, use_bin_type=True)
+        else:
+            body = serialization.dumps(data)
+
+        compression = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(body) >= self.compress_threshold:
+            compression = self.compression
+            if compression == COMPRESSION_ZSTD:
+                body = self._zstd_compressor.compress(body)
+            else:
+                body = zlib.compress(body)
+        return bytes([HEADER_MARK | compression | FORMATS[self.codec]]) + body
+
+    def decode(self, item):
+        """
+        Декодирует элемент очереди в любом поддерживаемом формате, включая JSON без заголовка.
+        """
+        if isinstance(item, str):
+            item = item.encode()
+        if not item or not item[0] & HEADER_MARK:
+            return serialization.loads(item)
+
+        header, body = item[0], item[1:]
+        compression = header & COMPRESSION_MASK
+        if compression == COMPRESSION_ZLIB:
+            body = zlib.decompress(body)
+        elif compression == COMPRESSION_ZSTD:
+            if self._zstd_decompressor is None:
+                raise ImportError("Для чтения элементов со сжатием zstd нужен пакет zstandard")
+            body = self._zstd_decompressor.decompress(body)
+        elif compression != COMPRESSION_NONE:
+            raise ValueError(f"Неизвестное сжатие в заголовке: {header:#04x}")
+
+        data_format = header & FORMAT_MASK
+        if data_format == FORMAT_MSGPACK:
+            if msgpack is None:
+                raise ImportError("Для чтения элементов msgpack нужен пакет msgpack")
+            return msgpack.unpackb(body, raw=False)
+        if data_format == FORMAT_JSON:
+            return serialization.loads(body)
+        raise ValueError(f"Неизвестный формат в заголовке: {header:#04x}")
@@ -1,30 +1,53 @@
 import redis
 
+from src.redis.QueueCodec import QueueCodec
+
 
 class RedisQueue:
-    def __init__(self, queue_name, host, port=6379, db=0):
+    def __init__(self, queue_name, host=None, port=6379, db=0, codec=None, connection=None):
         """
         Инициализирует подключение к Redis и имя очереди.
+        Готовое подключение (connection) позволяет нескольким очередям использовать общий пул.
         """
         self.queue_name = queue_name
-        self.redis_conn = redis.Redis(host=host, port=port, db=db)
+        self.redis_conn = connection if connection is not None else redis.Redis(host=host, port=port, db=db)
+        self.codec = codec if codec is not None else QueueCodec()
+
+    def _encode(self, data):
+        # Готовые строки и байты отправляются как есть, объекты кодируются кодеком очереди
+        return data if isinstance(data, (str, bytes)) else self.codec.encode(data)
 
     def send_to_queue(self, data):
         """
         Отправляет данные в очередь
         """
-        self.redis_conn.rpush(self.queue_name, data)
+        self.redis_conn.rpush(self.queue_name, self._encode(data))
+
+    def send_many_to_queue(self, items):
+        """
+        Отправляет пачку элементов в очередь одной командой
+        """
+        if items:
+            self.redis_conn.rpush(self.queue_name, *[self._encode(item) for item in items])
+
+    def depth(self):
+        """
+        Возвращает число элементов в очереди
+        """
+        return self.redis_conn.llen(self.queue_name)
 
     def receive_from_queue(self, block=True, timeout=None):
         """
-        Получает данные из очереди
+        Получает данные из очереди и декодирует их
         Если блокировка включена, будет ждать до появления данных.
         """
         if block:
-            item = self.redis_conn.blpop(self.queue_name, timeout=timeout)
+            # blpop возвращает пару (имя очереди, элемент), lpop - сам элемент
+            popped = self.redis_conn.blpop(self.queue_name, timeout=timeout)
+            item = popped[1] if popped else None
         else:
             item = self.redis_conn.lpop(self.queue_name)
 
-        return item[1] if item else None
+        return self.codec.decode(item) if item else None
 
 
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+
+from src.logger import logger
+
+
+class ShardCoordinator:
+    def __init__(self, redis_conn, worker_id, lease_ttl=60, namespace="collector"):
+        """
+        Координирует распределение источников между репликами через Redis.
+
+        Каждая реплика держит продлеваемую аренду (lease) в sorted set, где score - время истечения.
+        Источник закрепляется за живой репликой по rendezvous-хешированию, поэтому при появлении
+        или падении реплики переезжает только часть источников.
+
+        :param redis_conn: Подключение к Redis
+        :param worker_id: Уникальный идентификатор реплики
+        :param lease_ttl: Время жизни аренды в секундах
+        :param namespace: Префикс ключей в Redis
+        """
+        self.redis_conn = redis_conn
+        self.worker_id = worker_id
+        self.lease_ttl = lease_ttl
+        self.workers_key = f"{namespace}:workers"
+        self._stop = threading.Event()
+        self._thread = None
+        self._assignment_key = None
+        self._assignment: list[str] = []
+
+    def heartbeat(self):
+        """
+        Продлевает аренду текущей реплики и удаляет истекшие аренды других реплик.
+        """
+        now = time.time()
+        pipe = self.redis_conn.pipeline()
+        pipe.zadd(self.workers_key, {self.worker_id: now + self.lease_ttl})
+        pipe.zremrangebyscore(self.workers_key, "-inf", now)
+        pipe.execute()
+
+    def start(self):
+        """
+        Запускает фоновое продление аренды (каждую треть TTL).
+        Если Redis недоступен, аренду получит фоновый поток при следующей попытке.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        try:
+            self.heartbeat()
+        except Exception as e:
+            logger.warning("Не удалось получить аренду при запуске", extra={"tags": {
+                "worker_id": self.worker_id,
+                "error": str(e)
+            }})
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name="shard-heartbeat", daemon=True)
+        self._thread.start()
+        logger.info("Реплика зарегистрирована", extra={"tags": {
+            "worker_id": self.worker_id,
+            "lease_ttl": self.lease_ttl
+        }})
+
+    def stop(self):
+        """
+        Останавливает продление аренды и освобождает источники для других реплик.
+        """
+        self._stop.set()
+        try:
+            self.redis_conn.zrem(self.workers_key, self.worker_id)
+        except Exception as e:
+            logger.warning("Не удалось снять аренду реплики", extra={"tags": {"error": str(e)}})
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.lease_ttl / 3):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.warning("Ошибка продления аренды", extra={"tags": {
+                    "worker_id": self.worker_id,
+                    "error": str(e)
+                }})
+
+    def live_workers(self) -> list[str]:
+        """
+        Возвращает отсортированный список реплик с действующей арендой.
+        """
+        members = self.redis_conn.zrangebyscore(self.workers_key, time.time(), "+inf")
+        workers = {m.decode() if isinstance(m, bytes) else m for m in members}
+        workers.add(self.worker_id)
+        return sorted(workers)
+
+    @staticmethod
+    def _weight(worker: str, source: str) -> int:
+        digest = hashlib.blake2b(f"{worker}\x00{source}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def owner(self, source: str, workers: list[str]) -> str:
+        """
+        Определяет реплику-владельца источника (rendezvous hashing).
+        """
+        return max(workers, key=lambda worker: self._weight(worker, source))
+
+    def filter_owned(self, sources: list[str], version=None) -> list[str]:
+        """
+        Оставляет только источники, закрепленные за текущей репликой.
+        Если передана версия списка источников, распределение пересчитывается только при смене
+        версии или состава реплик.
+        Если Redis недоступен, реплика обрабатывает все источники, чтобы не терять новости.
+        """
+        try:
+            workers = self.live_workers()
+        except Exception as e:
+            logger.warning("Координация недоступна, обрабатываем все источники", extra={"tags": {
+                "worker_id": self.worker_id,
+                "error": str(e)
+            }})
+            return list(sources)
+
+        assignment_key = (version, tuple(workers)) if version is not None else None
+        if assignment_key is not None and assignment_key == self._assignment_key:
+            return self._assignment
+
+        owned = [source for source in sources if self.owner(source, workers) == self.worker_id]
+        self._assignment_key, self._assignment = assignment_key, owned
+        logger.info("Источники распределены между репликами", extra={"tags": {
+            "worker_id": self.worker_id,
+            "live_workers": len(workers),
+            "owned_sources": len(owned),
+            "total_sources": len(sources)
+        }})
+        return owned
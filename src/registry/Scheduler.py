@@ -0,0 +1,116 @@
+import heapq
+import time
+from typing import Optional
+
+from src.registry.SourceRegistry import Source
+
+
+class Scheduler:
+    def __init__(self):
+        """
+        Планировщик опроса источников с адаптивным интервалом.
+
+        Интервал источника сокращается вдвое, когда появились новые записи, и растет в полтора раза,
+        когда их нет, оставаясь в границах poll_min..poll_max. Ближайшие по времени источники
+        выбираются из кучи без просмотра всего реестра. Для каждого источника хранится водяной знак -
+        номер последней обработанной записи.
+        """
+        self._heap: list[tuple[float, str]] = []
+        self._next_due: dict[str, float] = {}
+        self._interval: dict[str, float] = {}
+        self._sources: dict[str, Source] = {}
+        self._watermarks: dict[str, int] = {}
+        self._restored: dict[str, tuple[float, float]] = {}
+
+    def sync(self, sources: dict[str, Source]) -> None:
+        """
+        Обновляет набор опрашиваемых источников. Новые источники становятся доступны сразу,
+        удаленные вычищаются из кучи лениво.
+        """
+        for name in list(self._sources):
+            if name not in sources:
+                del self._sources[name]
+                self._next_due.pop(name, None)
+                self._interval.pop(name, None)
+                self._watermarks.pop(name, None)
+        now = time.time()
+        for name, source in sources.items():
+            self._sources[name] = source
+            if name not in self._next_due:
+                due_at, interval = self._restored.pop(name, (now, source.poll_min))
+                self._next_due[name] = due_at
+                self._interval[name] = min(max(interval, source.poll_min), source.poll_max)
+                heapq.heappush(self._heap, (due_at, name))
+            else:
+                self._interval[name] = min(max(self._interval[name], source.poll_min), source.poll_max)
+
+    def due(self, now: Optional[float] = None) -> list[Source]:
+        """
+        Возвращает источники, время опроса которых наступило, по убыванию приоритета.
+        """
+        now = time.time() if now is None else now
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, name = heapq.heappop(self._heap)
+            if self._next_due.get(name) == due_at:
+                ready.append(self._sources[name])
+        ready.sort(key=lambda source: -source.priority)
+        return ready
+
+    def mark(self, source: Source, found_new: int, now: Optional[float] = None) -> None:
+        """
+        Планирует следующий опрос источника с учетом того, нашлись ли новые записи.
+        """
+        if source.name not in self._sources:
+            return
+        now = time.time() if now is None else now
+        interval = self._interval.get(source.name, source.poll_min)
+        interval = interval / 2 if found_new else interval * 1.5
+        interval = min(max(interval, source.poll_min), source.poll_max)
+        self._interval[source.name] = interval
+        self.schedule(source.name, now + interval)
+
+    def schedule(self, name: str, due_at: float) -> None:
+        self._next_due[name] = due_at
+        heapq.heappush(self._heap, (due_at, name))
+
+    def watermark(self, name: str) -> int:
+        return self._watermarks.get(name, 0)
+
+    def advance_watermark(self, name: str, value: int) -> None:
+        if value > self._watermarks.get(name, 0):
+            self._watermarks[name] = value
+
+    def rewind_watermark(self, name: str, value: int) -> None:
+        """
+        Опускает водяной знак, чтобы записи новее value снова проверялись при следующем опросе.
+        """
+        if name in self._watermarks and value < self._watermarks[name]:
+            self._watermarks[name] = value
+
+    def snapshot(self) -> dict:
+        """
+        Возвращает состояние планировщика для передачи новому процессу: время следующего опроса
+        и интервал каждого источника, водяные знаки.
+        """
+        sources = {name: [due_at, interval] for name, (due_at, interval) in self._restored.items()}
+        sources.update((name, [due_at, self._interval[name]]) for name, due_at in self._next_due.items())
+        return {"sources": sources, "watermarks": dict(self._watermarks)}
+
+    def restore(self, state: dict) -> None:
+        """
+        Восстанавливает состояние из snapshot. Расписание применяется к источникам при следующем sync.
+        """
+        for name, (due_at, interval) in state.get("sources", {}).items():
+            if name not in self._next_due:
+                self._restored[name] = (float(due_at), float(interval))
+        for name, value in state.get("watermarks", {}).items():
+            self.advance_watermark(name, int(value))
+
+    def next_wakeup(self) -> Optional[float]:
+        """
+        Возвращает время ближайшего опроса.
+        """
+        while self._heap and self._next_due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
@@ -0,0 +1,210 @@
+import os
+import sys
+import threading
+from typing import Iterable, Optional
+
+from src import serialization
+from src.logger import logger
+
+SOURCE_TYPES = ("telegram", "site")
+DEFAULTS = {"priority": 1, "poll_min": 300, "poll_max": 1800, "media_policy": "full"}
+
+
+class Source:
+    __slots__ = ("name", "type", "rss", "priority", "poll_min", "poll_max", "media_policy")
+
+    def __init__(self, name: str, type: str, rss: Optional[str] = None, priority: int = 1, poll_min: int = 300,
+                 poll_max: int = 1800, media_policy: str = "full"):
+        """
+        Описание источника новостей. Строки интернируются, чтобы десятки тысяч записей
+        с одинаковыми типами и политиками не дублировали их в памяти.
+
+        :param name: Имя канала Telegram или URL сайта
+        :param type: telegram или site
+        :param rss: URL RSS-ленты сайта (необязательно)
+        :param priority: Приоритет опроса, больше - важнее
+        :param poll_min: Минимальный интервал опроса в секундах
+        :param poll_max: Максимальный интервал опроса в секундах
+        :param media_policy: Политика загрузки медиа
+        """
+        if type not in SOURCE_TYPES:
+            raise ValueError(f"Неизвестный тип источника {name}: {type}")
+        self.name = sys.intern(name)
+        self.type = sys.intern(type)
+        self.rss = rss
+        self.priority = int(priority)
+        self.poll_min = int(poll_min)
+        self.poll_max = max(int(poll_max), self.poll_min)
+        self.media_policy = sys.intern(media_policy)
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: Optional[dict] = None) -> "Source":
+        values = {**DEFAULTS, **(defaults or {}), **data}
+        return cls(**{key: values[key] for key in cls.__slots__ if key in values})
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.__slots__ if getattr(self, key) is not None}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Source) and all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Source({self.type}:{self.name})"
+
+
+class SourceRegistry:
+    def __init__(self, path: Optional[str] = None, redis_conn=None, hash_key="sources", changes_key="sources:changes"):
+        """
+        Реестр источников с перезагрузкой без перезапуска сервиса.
+
+        Источники читаются из JSON-файла или из Redis-хеша (поле - имя источника, значение - JSON).
+        Для Redis изменения отслеживаются по стриму changes_key, поэтому перезагрузка читает только
+        измененные записи. Реестр поддерживает индекс по типу источника.
+
+        :param path: Путь к JSON-файлу с источниками
+        :param redis_conn: Подключение к Redis; если задано, источники читаются из Redis
+        :param hash_key: Ключ Redis-хеша с источниками
+        :param changes_key: Ключ Redis-стрима с именами измененных источников
+        """
+        self.path = path
+        self.redis_conn = redis_conn
+        self.hash_key = hash_key
+        self.changes_key = changes_key
+        self.version = 0
+        self._lock = threading.Lock()
+        self._sources: dict[str, Source] = {}
+        self._by_type: dict[str, dict[str, None]] = {source_type: {} for source_type in SOURCE_TYPES}
+        self._file_stamp = None
+        self._last_change_id = None
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def get(self, name: str) -> Optional[Source]:
+        return self._sources.get(name)
+
+    def names(self, source_type: Optional[str] = None) -> list[str]:
+        if source_type is None:
+            return list(self._sources)
+        return list(self._by_type[source_type])
+
+    def by_type(self, source_type: str) -> list[Source]:
+        return [self._sources[name] for name in self._by_type[source_type]]
+
+    def _apply(self, changes: dict[str, Optional[Source]]) -> int:
+        """
+        Применяет изменения: имя -> новый источник или None для удаления. Возвращает число реальных изменений.
+        """
+        applied = 0
+        with self._lock:
+            for name, source in changes.items():
+                current = self._sources.get(name)
+                if source == current:
+                    continue
+                if current is not None:
+                    del self._by_type[current.type][name]
+                if source is None:
+                    self._sources.pop(name, None)
+                else:
+                    self._sources[source.name] = source
+                    self._by_type[source.type][source.name] = None
+                applied += 1
+            if applied:
+                self.version += 1
+        return applied
+
+    def reload(self) -> int:
+        """
+        Перечитывает источники, если они изменились. Возвращает число примененных изменений.
+        """
+        try:
+            if self.redis_conn is not None:
+                applied = self._reload_redis()
+            else:
+                applied = self._reload_file()
+        except Exception as e:
+            logger.error("Ошибка перезагрузки реестра источников", extra={"tags": {
+                "error": str(e),
+                "sources": len(self._sources)
+            }}, exc_info=True)
+            return 0
+
+        if applied:
+            logger.info("Реестр источников обновлен", extra={"tags": {
+                "changes": applied,
+                "sources": len(self._sources),
+                "registry_version": self.version
+            }})
+        return applied
+
+    def _reload_file(self) -> int:
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._file_stamp:
+            return 0
+
+        with open(self.path, "rb") as f:
+            data = serialization.loads(f.read())
+        if isinstance(data, list):
+            data = {"sources": data}
+        defaults = data.get("defaults")
+        loaded = {}
+        for item in data.get("sources", []):
+            source = Source.from_dict(item, defaults)
+            loaded[source.name] = source
+
+        changes: dict[str, Optional[Source]] = dict(loaded)
+        changes.update({name: None for name in self._sources if name not in loaded})
+        self._file_stamp = stamp
+        return self._apply(changes)
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _reload_redis(self) -> int:
+        if self._last_change_id is None or self._changes_trimmed():
+            # Полная загрузка: при первом запуске или если пропущенные изменения уже вытеснены из стрима
+            last = self.redis_conn.xrevrange(self.changes_key, count=1)
+            raw = self.redis_conn.hgetall(self.hash_key)
+            loaded = {self._decode(name): Source.from_dict(serialization.loads(value)) for name, value in raw.items()}
+            changes: dict[str, Optional[Source]] = dict(loaded)
+            changes.update({name: None for name in self._sources if name not in loaded})
+            self._last_change_id = self._decode(last[0][0]) if last else "0-0"
+            return self._apply(changes)
+
+        entries = self.redis_conn.xrange(self.changes_key, min=f"({self._last_change_id}", max="+")
+        if not entries:
+            return 0
+        names = list({self._decode(fields.get(b"name", fields.get("name"))) for _, fields in entries})
+        values = self.redis_conn.hmget(self.hash_key, names)
+        self._last_change_id = self._decode(entries[-1][0])
+        return self._apply({
+            name: Source.from_dict(serialization.loads(value)) if value is not None else None
+            for name, value in zip(names, values)
+        })
+
+    def _changes_trimmed(self) -> bool:
+        first = self.redis_conn.xrange(self.changes_key, count=1)
+        if not first or self._last_change_id == "0-0":
+            return False
+        return self._stream_id(first[0][0]) > self._stream_id(self._last_change_id)
+
+    @classmethod
+    def _stream_id(cls, value) -> tuple[int, int]:
+        milliseconds, _, sequence = cls._decode(value).partition("-")
+        return int(milliseconds), int(sequence or 0)
+
+    def publish(self, sources: Iterable[dict], removed: Iterable[str] = (), max_changes: int = 100000) -> None:
+        """
+        Записывает источники в Redis и уведомляет реплики об изменениях через стрим.
+        """
+        pipe = self.redis_conn.pipeline()
+        for item in sources:
+            source = Source.from_dict(item)
+            pipe.hset(self.hash_key, source.name, serialization.dumps(source.to_dict()))
+            pipe.xadd(self.changes_key, {"name": source.name}, maxlen=max_changes, approximate=True)
+        for name in removed:
+            pipe.hdel(self.hash_key, name)
+            pipe.xadd(self.changes_key, {"name": name}, maxlen=max_changes, approximate=True)
+        pipe.execute()
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+from src.logger import logger
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Запрос не выполнялся: цепь разомкнута, сервис считается недоступным.
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5, open_seconds=30, half_open_probes=2):
+        """
+        Автомат защиты от обращений к недоступному сервису.
+
+        Цепь размыкается, когда среди последних window вызовов (но не меньше min_calls) доля ошибок
+        достигает failure_rate. Пока цепь разомкнута, вызовы отклоняются сразу. Через open_seconds
+        пропускается half_open_probes пробных вызовов: если все успешны, цепь замыкается,
+        первая же ошибка снова размыкает ее.
+
+        :param name: Имя сервиса для логов
+        :param window: Число последних вызовов, по которым считается доля ошибок
+        :param min_calls: Минимальное число вызовов в окне для размыкания
+        :param failure_rate: Доля ошибок, при которой цепь размыкается
+        :param open_seconds: Время в разомкнутом состоянии до пробных вызовов, в секундах
+        :param half_open_probes: Число успешных пробных вызовов для замыкания
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    @property
+    def available(self) -> bool:
+        """
+        Можно ли сейчас обращаться к сервису (цепь замкнута или пришло время пробных вызовов).
+        """
+        return self.state != STATE_OPEN
+
+    def _refresh(self) -> None:
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(STATE_HALF_OPEN)
+            self._probes_started = self._probes_passed = 0
+
+    def _transition(self, state: str) -> None:
+        logger.warning("Состояние автомата защиты изменилось", extra={"tags": {
+            "service": self.name,
+            "from_state": self._state,
+            "to_state": state
+        }})
+        self._state = state
+
+    def _open(self) -> None:
+        self._transition(STATE_OPEN)
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def before_call(self) -> None:
+        """
+        Вызывается перед запросом. Бросает CircuitOpenError, если запрос выполнять не нужно.
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == STATE_OPEN:
+                raise CircuitOpenError(f"Сервис {self.name} недоступен, цепь разомкнута")
+            if self._state == STATE_HALF_OPEN:
+                if self._probes_started >= self.half_open_probes:
+                    raise CircuitOpenError(f"Сервис {self.name} проверяется пробными запросами")
+                self._probes_started += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._probes_passed += 1
+                if self._probes_passed >= self.half_open_probes:
+                    self._transition(STATE_CLOSED)
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._open()
+                return
+            if self._state == STATE_OPEN:
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
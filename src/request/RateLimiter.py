@@ -0,0 +1,182 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+
+from src.logger import logger
+
+# Атомарное списание токена из корзины хоста. Возвращает время ожидания в миллисекундах (0 - можно идти).
+TOKEN_BUCKET_SCRIPT = """
+local blocked = redis.call('PTTL', KEYS[2])
+if blocked > 0 then
+    return blocked
+end
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    def __init__(self, limits=None, default=(2.0, 5), redis_conn=None, namespace="ratelimit", max_retries=3,
+                 backoff=2.0):
+        """
+        Ограничитель частоты запросов с корзиной токенов на каждый хост.
+
+        Корзины хранятся в Redis и общие для всех реплик; если Redis недоступен, используется
+        локальная корзина. Ответы 429/5xx блокируют хост на Retry-After (или экспоненциальную паузу)
+        и временно снижают его скорость, которая затем плавно восстанавливается.
+
+        :param limits: Словарь хост -> (запросов в секунду, размер всплеска); поддомены наследуют лимит
+        :param default: Лимит для хостов, не указанных в limits
+        :param redis_conn: Подключение к Redis (по умолчанию None - только локальные корзины)
+        :param namespace: Префикс ключей в Redis
+        :param max_retries: Число повторов после 429/5xx
+        :param backoff: Базовая пауза в секундах, если сервер не прислал Retry-After
+        """
+        self.limits = limits or {}
+        self.default = default
+        self.redis_conn = redis_conn
+        self.namespace = namespace
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._script = redis_conn.register_script(TOKEN_BUCKET_SCRIPT) if redis_conn is not None else None
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._blocked_until: dict[str, float] = {}
+        self._factor: dict[str, float] = {}
+
+    def limit_for(self, host: str) -> tuple[float, int]:
+        """
+        Возвращает лимит хоста с учетом адаптивного понижения скорости.
+        """
+        labels = host.split(".")
+        rate, burst = self.default
+        for i in range(len(labels)):
+            suffix = ".".join(labels[i:])
+            if suffix in self.limits:
+                rate, burst = self.limits[suffix]
+                break
+        return rate * self._factor.get(host, 1.0), burst
+
+    def _local_wait(self, host: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            blocked = self._blocked_until.get(host, 0) - time.time()
+            if blocked > 0:
+                return blocked
+            tokens, ts = self._buckets.get(host, (burst, now))
+            tokens = min(burst, tokens + (now - ts) * rate)
+            if tokens >= 1:
+                self._buckets[host] = (tokens - 1, now)
+                return 0
+            self._buckets[host] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def _wait_time(self, host: str) -> float:
+        rate, burst = self.limit_for(host)
+        if self._script is not None:
+            try:
+                wait_ms = self._script(
+                    keys=[f"{self.namespace}:bucket:{host}", f"{self.namespace}:block:{host}"],
+                    args=[rate, burst, int(time.time() * 1000)]
+                )
+                return int(wait_ms) / 1000
+            except Exception as e:
+                logger.debug("Общая корзина недоступна, используем локальную", extra={"tags": {
+                    "host": host,
+                    "error": str(e)
+                }})
+        return self._local_wait(host, rate, burst)
+
+    def acquire(self, host: str) -> None:
+        """
+        Блокирует поток, пока для хоста не появится свободный токен.
+        """
+        while True:
+            wait = self._wait_time(host)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def penalize(self, host: str, delay: float) -> None:
+        """
+        Блокирует хост на delay секунд и вдвое снижает его скорость.
+        """
+        with self._lock:
+            self._blocked_until[host] = max(self._blocked_until.get(host, 0), time.time() + delay)
+            self._factor[host] = max(0.1, self._factor.get(host, 1.0) / 2)
+        if self.redis_conn is not None:
+            try:
+                self.redis_conn.set(f"{self.namespace}:block:{host}", 1, px=int(delay * 1000))
+            except Exception:
+                pass
+        logger.warning("Хост ограничил частоту запросов", extra={"tags": {
+            "host": host,
+            "delay": delay,
+            "rate_factor": self._factor[host]
+        }})
+
+    def _recover(self, host: str) -> None:
+        factor = self._factor.get(host)
+        if factor is not None:
+            with self._lock:
+                if factor >= 0.95:
+                    self._factor.pop(host, None)
+                else:
+                    self._factor[host] = factor + 0.05
+
+    @staticmethod
+    def retry_after(response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Выполняет HTTP-запрос с соблюдением лимита хоста и повторами после 429/5xx.
+        Сетевые исключения requests пробрасываются вызывающему коду.
+        """
+        host = urlparse(url).hostname or ""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(host)
+            response = requests.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                self._recover(host)
+                return response
+            if attempt == self.max_retries:
+                return response
+            delay = self.retry_after(response)
+            self.penalize(host, delay if delay is not None else self.backoff * 2 ** attempt)
+            response.close()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
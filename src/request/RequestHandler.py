@@ -2,26 +2,58 @@ from typing import Optional
 
 import requests
 from pydantic import BaseModel, ValidationError
+
+from src import serialization
 from src.logger import logger
+from src.request.CircuitBreaker import CircuitBreaker, CircuitOpenError
 
 
 class RequestHandler:
-    def __init__(self, base_url, headers=None, timeout=10):
+    def __init__(self, base_url, headers=None, timeout=10, upload_timeout=120, breaker: Optional[CircuitBreaker] = None):
         """
         Инициализация класса для работы с запросами.
 
         :param base_url: Базовый URL для запросов
         :param headers: Заголовки для запросов (по умолчанию None)
         :param timeout: Тайм-аут для запросов (по умолчанию 10 секунд)
+        :param upload_timeout: Тайм-аут загрузки файлов (по умолчанию 120 секунд)
+        :param breaker: Автомат защиты; пока цепь разомкнута, запросы завершаются сразу без обращения к сервису
         """
         self.base_url = base_url
         self.headers = headers if headers is not None else {}
         self.timeout = timeout
+        self.upload_timeout = upload_timeout
+        self.breaker = breaker
         logger.debug("Инициализация RequestHandler", extra={"tags": {
             "base_url": base_url,
             "timeout": timeout
         }})
 
+    @property
+    def available(self) -> bool:
+        """
+        False, пока цепь автомата защиты разомкнута.
+        """
+        return self.breaker is None or self.breaker.available
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Выполняет запрос через автомат защиты: сетевые ошибки и ответы 5xx считаются отказами сервиса.
+        """
+        if self.breaker is None:
+            return requests.request(method, url, **kwargs)
+        self.breaker.before_call()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
     def get(
             self, endpoint: str, path_params: Optional[BaseModel] = None, query_params: Optional[BaseModel] = None,
             response_model: Optional[BaseModel] = None
@@ -36,23 +68,24 @@ class RequestHandler:
         :return: Ответ сервера в формате JSON (если есть) или текстовый ответ
         """
         try:
+            path_params_dict = serialization.to_dict(path_params) if path_params else None
+            query_params_dict = serialization.to_dict(query_params) if query_params else None
+
             # Логирование параметров запроса
             logger.info("Начало GET-запроса", extra={"tags": {
                 "operation": "http_request",
                 "endpoint": endpoint,
-                "path_params": path_params.dict() if path_params else None,
-                "query_params": query_params.dict() if query_params else None
+                "path_params": path_params_dict,
+                "query_params": query_params_dict
             }})
             
             # Формируем URL с подстановкой параметров пути
-            if path_params:
-                endpoint = endpoint.format(**path_params.dict())
+            if path_params_dict:
+                endpoint = endpoint.format(**path_params_dict)
 
             url = f"{self.base_url}/{endpoint}"
 
-            # Преобразуем параметры запроса в словарь
-            query_params_dict = query_params.dict() if query_params else None
-            response = requests.get(url, headers=self.headers, params=query_params_dict, timeout=self.timeout)
+            response = self._send("GET", url, headers=self.headers, params=query_params_dict, timeout=self.timeout)
             response.raise_for_status()
 
             # Логирование успешного ответа
@@ -64,15 +97,18 @@ class RequestHandler:
             }})
             
             # Обрабатываем ответ с использованием модели
-            data = response.json() if response.headers.get('Content-Type') == 'application/json' else response.text
+            is_json = response.headers.get('Content-Type') == 'application/json'
             if response_model:
-                parsed_data = response_model.parse_obj(data)
+                parsed_data = serialization.validate(response_model, response.content if is_json else response.text)
                 logger.info("Данные успешно валидированы", extra={"tags": {
                     "model": response_model.__name__,
-                    "data_size": len(str(parsed_data))
+                    "data_size": len(response.content)
                 }})
                 return parsed_data
-            return data
+            return serialization.loads(response.content) if is_json else response.text
+        except CircuitOpenError as e:
+            logger.debug(str(e), extra={"tags": {"url": url, "method": "GET"}})
+            return None
         except requests.exceptions.RequestException as e:
             logger.error("Ошибка сетевого запроса", extra={"tags": {
                 "error_type": type(e).__name__,
@@ -96,18 +132,21 @@ class RequestHandler:
             }})
             
             if path_params:
-                endpoint = endpoint.format(**path_params.dict())
+                endpoint = endpoint.format(**serialization.to_dict(path_params))
             # query_params_dict = query_params.dict() if query_params else None
             url = f"{self.base_url}/{endpoint}"
-            response = requests.post(url, files=files)
+            response = self._send("POST", url, files=files, timeout=self.upload_timeout)
             response.raise_for_status()
             
             logger.info("Файлы успешно загружены", extra={"tags": {
                 "status_code": response.status_code,
                 "upload_time": response.elapsed.total_seconds()
             }})
-            return response.json()
-            
+            return serialization.loads(response.content)
+
+        except CircuitOpenError as e:
+            logger.debug(str(e), extra={"tags": {"url": url, "method": "POST"}})
+            return {}
         except Exception as e:
             logger.error("Ошибка загрузки файлов", extra={"tags": {
                 "error_type": type(e).__name__,
@@ -127,16 +166,17 @@ class RequestHandler:
             :return: Ответ сервера в формате JSON (если есть) или текстовый ответ
             """
         try:
+            body = serialization.dumps(serialization.to_dict(data)) if data else None
             logger.info("Начало POST-запроса", extra={"tags": {
                 "operation": "http_request",
                 "endpoint": endpoint,
-                "data_size": len(str(data.dict())) if data else 0
+                "data_size": len(body) if body else 0
             }})
             
             url = f"{self.base_url}/{endpoint}"
-            data_dict = data.dict() if data else None
+            headers = {**self.headers, 'Content-Type': 'application/json'} if body else self.headers
             
-            response = requests.post(url, headers=self.headers, json=data_dict, timeout=self.timeout)
+            response = self._send("POST", url, headers=headers, data=body, timeout=self.timeout)
             response.raise_for_status()
             
             logger.debug("Успешный POST-ответ", extra={"tags": {
@@ -144,15 +184,18 @@ class RequestHandler:
                 "response_time": response.elapsed.total_seconds()
             }})
             
-            response_data = response.json() if response.headers.get('Content-Type') == 'application/json' else response.text
+            is_json = response.headers.get('Content-Type') == 'application/json'
             if response_model:
-                parsed_data = response_model.parse_obj(response_data)
+                parsed_data = serialization.validate(response_model, response.content if is_json else response.text)
                 logger.info("POST-данные валидированы", extra={"tags": {
                     "model": response_model.__name__,
-                    "data_size": len(str(parsed_data))
+                    "data_size": len(response.content)
                 }})
                 return parsed_data
-            return response_data
+            return serialization.loads(response.content) if is_json else response.text
+        except CircuitOpenError as e:
+            logger.debug(str(e), extra={"tags": {"url": url, "method": "POST"}})
+            return None
         except requests.exceptions.RequestException as e:
             logger.error("Ошибка сетевого запроса", extra={"tags": {
                 "error_type": type(e).__name__,
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Callable, Optional
+
+import requests
+
+from src import serialization
+from src.logger import logger
+
+CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    """
+    Кодировка из заголовка Content-Type. None, если сервер ее не указал.
+    """
+    match = CHARSET_RE.search(content_type or "")
+    return match.group(1) if match else None
+
+
+class CachedResponse:
+    def __init__(self, url: str, status_code: int, content: bytes, headers: dict, from_cache: bool = False):
+        """
+        Минимальная замена requests.Response для ответов, прошедших через кеш.
+
+        encoding - только кодировка, явно указанная в Content-Type. Без нее text декодирует тело как UTF-8,
+        а HTML лучше передавать парсеру байтами, чтобы кодировку определил он (по meta charset).
+        """
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.encoding = header_charset(self.headers.get("Content-Type"))
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=None)
+
+
+class ResponseCache:
+    def __init__(self, directory: str, ttls: dict, fetcher: Callable[..., requests.Response], max_bytes: int,
+                 replay: bool = False, compress_level: int = 6):
+        """
+        Дисковый кеш HTTP-ответов с ключом по URL.
+
+        Тело хранится сжатым zlib, рядом с ним - заголовки для ревалидации (ETag, Last-Modified).
+        Свежие записи отдаются без запросов, устаревшие перепроверяются условным запросом.
+        При превышении бюджета удаляются записи, к которым дольше всего не обращались.
+
+        :param directory: Каталог кеша
+        :param ttls: Словарь тип источника -> срок жизни записи в секундах
+        :param fetcher: Функция загрузки (url, **kwargs) -> requests.Response
+        :param max_bytes: Бюджет кеша на диске в байтах
+        :param replay: Отдавать любые закешированные ответы без обращения к сети
+        :param compress_level: Уровень сжатия zlib
+        """
+        self.directory = directory
+        self.ttls = ttls
+        self.fetcher = fetcher
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _read(self, key: str) -> Optional[tuple[dict, bytes]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                meta = serialization.loads(f.readline())
+                body = zlib.decompress(f.read())
+            os.utime(path)
+            return meta, body
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning("Поврежденная запись кеша", extra={"tags": {"key": key, "error": str(e)}})
+            self._remove(path)
+            return None
+
+    def _write(self, key: str, meta: dict, body: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = serialization.dumps(meta) + b"\n" + zlib.compress(body, self.compress_level)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        self._account(len(data) - previous)
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._account(-size)
+        except OSError:
+            pass
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _account(self, delta: int) -> None:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._total_bytes += delta
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Удаляет самые давно использованные записи, пока кеш не займет 90% бюджета.
+        """
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._total_bytes = total
+        logger.info("Очистка кеша HTTP-ответов", extra={"tags": {"removed_entries": removed, "cache_bytes": total}})
+
+    def _is_fresh(self, meta: dict, source_type: str) -> bool:
+        return self.replay or time.time() - meta["fetched_at"] < self.ttls.get(source_type, 0)
+
+    def fetch(self, url: str, source_type: str, headers: Optional[dict] = None, **kwargs) -> CachedResponse:
+        """
+        Загружает URL через кеш. Сетевые исключения пробрасываются вызывающему коду.
+        """
+        cached = self._read(url)
+        if cached:
+            meta, body = cached
+            if self._is_fresh(meta, source_type):
+                return CachedResponse(url, meta["status_code"], body, meta["headers"], True)
+
+        request_headers = dict(headers or {})
+        if cached:
+            if meta["headers"].get("ETag"):
+                request_headers["If-None-Match"] = meta["headers"]["ETag"]
+            if meta["headers"].get("Last-Modified"):
+                request_headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+
+        response = self.fetcher(url, headers=request_headers, **kwargs)
+        if response.status_code == 304 and cached:
+            meta["fetched_at"] = time.time()
+            self._write(url, meta, body)
+            return CachedResponse(url, meta["status_code"], body, meta["headers"], True)
+
+        result = CachedResponse(url, response.status_code, response.content, dict(response.headers))
+        if response.status_code == 200 and "no-store" not in response.headers.get("Cache-Control", ""):
+            meta = {
+                "url": url,
+                "status_code": response.status_code,
+                "fetched_at": time.time(),
+                "headers": {name: response.headers[name]
+                            for name in ("Content-Type", "ETag", "Last-Modified") if name in response.headers},
+            }
+            self._write(url, meta, response.content)
+        return result
+
+    def remember(self, key: str, source_type: str, compute: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """
+        Кеширует результат произвольной загрузки (например, вывода snscrape) по ключу.
+        Пустой результат не сохраняется.
+        """
+        cached = self._read(key)
+        if cached and self._is_fresh(cached[0], source_type):
+            return cached[1]
+        body = compute()
+        if body:
+            self._write(key, {"url": key, "fetched_at": time.time()}, body)
+        return body
@@ -0,0 +1,65 @@
+"""
+Единая точка сериализации: orjson, если установлен, иначе стандартный json.
+Модели pydantic валидируются через закешированные TypeAdapter, JSON-ответы разбираются без промежуточного dict.
+"""
+import json
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        """
+        Сериализует объект в JSON (UTF-8, без экранирования не-ASCII символов).
+        """
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(data: bytes | str) -> Any:
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> bytes:
+        """
+        Сериализует объект в JSON (UTF-8, без экранирования не-ASCII символов).
+        """
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(data: bytes | str) -> Any:
+        return json.loads(data)
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode()
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def to_dict(model: BaseModel) -> dict:
+    return model.model_dump()
+
+
+def validate(tp: Any, data: Any) -> Any:
+    """
+    Валидирует данные по модели или типу. Строки и байты разбираются как JSON напрямую в модель.
+    """
+    adapter = type_adapter(tp)
+    if isinstance(data, (bytes, bytearray, str)):
+        return adapter.validate_json(data)
+    return adapter.validate_python(data)
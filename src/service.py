@@ -1,6 +1,235 @@
-from src.redis.RedisManager import RedisQueue
-from src.request.RequestHandler import RequestHandler
+"""
+Клиенты внешних сервисов создаются при первом обращении (service.redis, service.api, ...),
+чтобы импорт модулей не тянул за собой подключения и тяжелые зависимости.
+"""
+from functools import cache
+
+from src import conf
 from src.service_url import get_url_redis, get_url_emily_database_handler
 
-api = RequestHandler(base_url=get_url_emily_database_handler())
-redis = RedisQueue(queue_name="filter", host=get_url_redis(), port=6379, db=0)
+
+_redis_connection = None
+
+
+def set_redis_connection(connection) -> None:
+    """
+    Подменяет подключение к Redis до первого обращения к клиентам (нагрузочный стенд, локальный запуск).
+    """
+    global _redis_connection
+    _redis_connection = connection
+
+
+def get_redis_connection():
+    global _redis_connection
+    if _redis_connection is None:
+        import redis
+
+        _redis_connection = redis.Redis(host=get_url_redis(), port=6379, db=0)
+    return _redis_connection
+
+
+@cache
+def get_api():
+    from src.request.CircuitBreaker import CircuitBreaker
+    from src.request.RequestHandler import RequestHandler
+
+    return RequestHandler(
+        base_url=get_url_emily_database_handler(),
+        timeout=conf.API_TIMEOUT,
+        upload_timeout=conf.API_UPLOAD_TIMEOUT,
+        breaker=CircuitBreaker(
+            name="emily-database-handler",
+            window=conf.API_BREAKER_WINDOW,
+            min_calls=conf.API_BREAKER_MIN_CALLS,
+            failure_rate=conf.API_BREAKER_FAILURE_RATE,
+            open_seconds=conf.API_BREAKER_OPEN_SECONDS,
+            half_open_probes=conf.API_BREAKER_HALF_OPEN_PROBES,
+        ),
+    )
+
+
+@cache
+def get_redis():
+    from src.redis.QueueCodec import QueueCodec
+    from src.redis.RedisManager import RedisQueue
+
+    return RedisQueue(
+        queue_name="filter",
+        connection=get_redis_connection(),
+        codec=QueueCodec(
+            codec=conf.QUEUE_CODEC,
+            compression=conf.QUEUE_COMPRESSION,
+            compress_threshold=conf.QUEUE_COMPRESS_THRESHOLD
+        ),
+    )
+
+
+@cache
+def get_shard():
+    from src.redis.ShardCoordinator import ShardCoordinator
+
+    return ShardCoordinator(redis_conn=get_redis().redis_conn, worker_id=conf.WORKER_ID, lease_ttl=conf.SHARD_LEASE_TTL)
+
+
+@cache
+def get_outbox():
+    from src.outbox.Outbox import Outbox
+
+    return Outbox(path=conf.OUTBOX_PATH, max_attempts=conf.OUTBOX_MAX_ATTEMPTS)
+
+
+@cache
+def get_dedup():
+    from src.feature.NearDuplicate import NearDuplicateIndex
+
+    return NearDuplicateIndex(
+        window=conf.DEDUP_WINDOW,
+        max_distance=conf.DEDUP_MAX_DISTANCE,
+        min_tokens=conf.DEDUP_MIN_TOKENS,
+        redis_conn=get_redis().redis_conn if conf.DEDUP_BACKEND == "redis" else None,
+    )
+
+
+@cache
+def get_limiter():
+    from src.request.RateLimiter import RateLimiter
+
+    return RateLimiter(
+        limits=conf.RATE_LIMITS,
+        default=conf.RATE_LIMIT_DEFAULT,
+        redis_conn=get_redis().redis_conn,
+        max_retries=conf.RATE_LIMIT_MAX_RETRIES,
+    )
+
+
+@cache
+def get_http_cache():
+    from src.request.ResponseCache import ResponseCache
+
+    return ResponseCache(
+        directory=conf.HTTP_CACHE_DIR,
+        ttls=conf.HTTP_CACHE_TTLS,
+        fetcher=get_limiter().get,
+        max_bytes=conf.HTTP_CACHE_MAX_BYTES,
+        replay=conf.HTTP_CACHE_REPLAY,
+    )
+
+
+@cache
+def get_registry():
+    from src.registry.SourceRegistry import SourceRegistry
+
+    if conf.SOURCES_BACKEND == "redis":
+        return SourceRegistry(redis_conn=get_redis().redis_conn)
+    return SourceRegistry(path=conf.SOURCES_PATH)
+
+
+@cache
+def get_scheduler():
+    from src.registry.Scheduler import Scheduler
+
+    return Scheduler()
+
+
+@cache
+def get_metrics():
+    from src.metrics import Metrics
+
+    return Metrics()
+
+
+@cache
+def get_backpressure():
+    from src.redis.Backpressure import QueueBackpressure
+
+    return QueueBackpressure(
+        queue=get_redis(),
+        high_water=conf.BACKPRESSURE_HIGH_WATER,
+        low_water=conf.BACKPRESSURE_LOW_WATER,
+        max_depth=conf.BACKPRESSURE_MAX_DEPTH,
+        metrics=get_metrics(),
+    )
+
+
+@cache
+def get_deferred_media():
+    from src.redis.RedisManager import RedisQueue
+
+    return RedisQueue(queue_name="media_deferred", connection=get_redis_connection())
+
+
+@cache
+def get_media_budget():
+    from src.feature.MediaPolicy import MediaBudget
+
+    return MediaBudget(total_bytes=conf.MEDIA_CYCLE_BUDGET)
+
+
+@cache
+def get_image_processor():
+    from src.feature.ImageProcessor import ImageProcessor
+
+    return ImageProcessor(
+        enabled=conf.IMAGE_PROCESSING,
+        max_side=conf.IMAGE_MAX_SIDE,
+        quality=conf.IMAGE_QUALITY,
+        image_format=conf.IMAGE_FORMAT,
+        workers=conf.IMAGE_WORKERS,
+    )
+
+
+@cache
+def get_outlinks():
+    from src.feature.Outlinks import OutlinkCache, OutlinkProcessor
+
+    return OutlinkProcessor(
+        shorteners=conf.OUTLINK_SHORTENERS,
+        cache=OutlinkCache(
+            max_size=conf.OUTLINK_CACHE_SIZE,
+            ttl=conf.OUTLINK_CACHE_TTL,
+            redis_conn=get_redis().redis_conn if conf.OUTLINK_CACHE_BACKEND == "redis" else None,
+        ),
+        resolve=conf.OUTLINK_RESOLVE,
+        workers=conf.OUTLINK_RESOLVE_WORKERS,
+        max_redirects=conf.OUTLINK_MAX_REDIRECTS,
+    )
+
+
+@cache
+def get_freshness():
+    from src.freshness import FreshnessTracker
+
+    return FreshnessTracker(
+        metrics=get_metrics(),
+        slo=conf.FRESHNESS_SLO,
+        percentile=conf.FRESHNESS_SLO_PERCENTILE,
+        min_samples=conf.FRESHNESS_MIN_SAMPLES,
+        reservoir=conf.FRESHNESS_SAMPLES,
+    )
+
+
+_factories = {
+    "api": get_api,
+    "redis": get_redis,
+    "shard": get_shard,
+    "outbox": get_outbox,
+    "dedup": get_dedup,
+    "limiter": get_limiter,
+    "http_cache": get_http_cache,
+    "registry": get_registry,
+    "scheduler": get_scheduler,
+    "metrics": get_metrics,
+    "backpressure": get_backpressure,
+    "deferred_media": get_deferred_media,
+    "media_budget": get_media_budget,
+    "image_processor": get_image_processor,
+    "outlinks": get_outlinks,
+    "freshness": get_freshness,
+}
+
+
+def __getattr__(name):
+    factory = _factories.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return factory()
@@ -1,3 +1,4 @@
+import os
 from enum import Enum
 from typing import Dict, Optional
 
@@ -26,6 +27,7 @@ SERVICE_URLS: Dict[str, Dict[str, str]] = {
 def get_service_url(service_name: str) -> Optional[str]:
     """
     Получает URL сервиса по его имени для текущего окружения.
+    Переменная окружения <ИМЯ_СЕРВИСА>_URL (например, LOKI_URL) имеет приоритет.
     
     Args:
         service_name: Имя сервиса
@@ -36,6 +38,10 @@ def get_service_url(service_name: str) -> Optional[str]:
     Raises:
         KeyError: Если текущее окружение не поддерживается
     """
+    override = os.getenv(f"{service_name.upper()}_URL")
+    if override:
+        return override
+
     if ENV not in SERVICE_URLS:
         raise KeyError(f"Неизвестное окружение: {ENV}. Поддерживаемые окружения: {list(SERVICE_URLS.keys())}")
 
@@ -0,0 +1,56 @@
+"""
+Отчет о времени холодного старта: python -m src.startup [модуль] [--top N]
+
+Запускает импорт модуля в отдельном интерпретаторе с -X importtime и суммирует
+собственное время импорта по пакетам верхнего уровня.
+"""
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+def measure_imports(module: str) -> tuple[float, dict[str, int]]:
+    """
+    Импортирует модуль в чистом интерпретаторе.
+
+    :return: Полное время запуска в секундах и словарь пакет -> собственное время импорта в микросекундах
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr[-2000:]}")
+
+    by_package: dict[str, int] = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        by_package[package] += int(self_us)
+    return elapsed, dict(by_package)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Время импорта по пакетам")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    elapsed, by_package = measure_imports(args.module)
+    total_us = sum(by_package.values())
+    print(f"Старт интерпретатора с импортом {args.module}: {elapsed * 1000:.1f} мс, "
+          f"из них импорт модулей: {total_us / 1000:.1f} мс")
+    print(f"{'пакет':<32}{'мс':>10}{'доля':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / total_us:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
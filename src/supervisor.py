@@ -0,0 +1,178 @@
+"""
+Режим супервизора: такты сбора выполняются в дочернем процессе, который перезапускается
+после заданного числа тактов или при превышении порога RSS. Состояние планировщика
+передается от процесса к процессу, поэтому перезапуск не сбивает расписание опроса.
+"""
+import multiprocessing
+import os
+import resource
+import signal
+import time
+from typing import Callable, Optional
+
+from src import serialization
+from src.logger import logger
+
+MB = 1024 * 1024
+
+
+def rss_bytes() -> int:
+    """
+    Текущий RSS процесса. Без /proc возвращает пиковое значение из getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryMonitor:
+    def __init__(self, metrics=None):
+        """
+        Отслеживает рост памяти процесса от такта к такту.
+        """
+        self.metrics = metrics
+        self.started_rss = rss_bytes()
+        self.last_rss = self.started_rss
+
+    def sample(self, cycle: int) -> int:
+        """
+        Записывает в лог RSS после такта и его прирост. Возвращает текущий RSS в байтах.
+        """
+        rss = rss_bytes()
+        logger.info("Память после такта", extra={"tags": {
+            "cycle": cycle,
+            "rss_mb": round(rss / MB, 1),
+            "growth_mb": round((rss - self.last_rss) / MB, 2),
+            "total_growth_mb": round((rss - self.started_rss) / MB, 1)
+        }})
+        if self.metrics is not None:
+            self.metrics.set_gauge("worker_rss_bytes", rss)
+        self.last_rss = rss
+        return rss
+
+
+class Supervisor:
+    def __init__(self, target: Callable, state_path: str, max_cycles: int, max_rss: int, restart_delay: float = 5,
+                 max_restart_delay: float = 300):
+        """
+        Запускает target(conn, state, max_cycles, max_rss) в дочернем процессе (spawn) и перезапускает его
+        после завершения. Дочерний процесс после каждого такта присылает через conn состояние
+        планировщика; супервизор сохраняет его на диск и передает следующему процессу.
+
+        :param target: Функция рабочего процесса (должна импортироваться по имени)
+        :param state_path: Файл с последним состоянием планировщика
+        :param max_cycles: Число тактов, после которого рабочий процесс перезапускается
+        :param max_rss: Порог RSS в байтах, при превышении которого рабочий процесс перезапускается
+        :param restart_delay: Пауза перед перезапуском после аварийного завершения, в секундах
+        :param max_restart_delay: Предел паузы, которая удваивается, пока процессы падают до первого такта
+        """
+        self.target = target
+        self.state_path = state_path
+        self.max_cycles = max_cycles
+        self.max_rss = max_rss
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._stopping = False
+
+    def load_state(self) -> Optional[dict]:
+        try:
+            with open(self.state_path, "rb") as f:
+                return serialization.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning("Состояние планировщика повреждено и пропущено", extra={"tags": {"error": str(e)}})
+            return None
+
+    def save_state(self, state: dict) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(serialization.dumps(state))
+        os.replace(tmp_path, self.state_path)
+
+    def run_worker(self) -> tuple[int, int]:
+        """
+        Запускает один рабочий процесс и сохраняет присылаемые им состояния до его завершения.
+        Возвращает код завершения процесса и число выполненных им тактов.
+        """
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=self.target,
+            args=(sender, self.load_state(), self.max_cycles, self.max_rss),
+            name="collector-worker",
+        )
+        started = time.time()
+        process.start()
+        self._process = process
+        if self._stopping:
+            # Сигнал пришел, пока процесс запускался
+            process.terminate()
+        sender.close()
+        cycles = 0
+        while True:
+            try:
+                state = receiver.recv()
+            except EOFError:
+                break
+            self.save_state(state)
+            cycles += 1
+        receiver.close()
+        process.join()
+        self._process = None
+
+        logger.info("Рабочий процесс завершен", extra={"tags": {
+            "pid": process.pid,
+            "exit_code": process.exitcode,
+            "cycles": cycles,
+            "uptime": round(time.time() - started, 1)
+        }})
+        return process.exitcode, cycles
+
+    def _forward_signal(self, signum, frame) -> None:
+        """
+        Передает остановку рабочему процессу (SIGTERM), чтобы он завершился штатно и снял аренду реплики.
+        Супервизор дожидается его завершения и больше не перезапускает.
+        """
+        self._stopping = True
+        process = self._process
+        if process is not None and process.is_alive():
+            process.terminate()
+
+    def _sleep(self, delay: float) -> None:
+        deadline = time.time() + delay
+        while not self._stopping and time.time() < deadline:
+            time.sleep(min(1.0, deadline - time.time()))
+
+    def run(self) -> None:
+        logger.info("Запуск супервизора", extra={"tags": {
+            "max_cycles": self.max_cycles,
+            "max_rss_mb": self.max_rss // MB
+        }})
+        signal.signal(signal.SIGTERM, self._forward_signal)
+        signal.signal(signal.SIGINT, self._forward_signal)
+        early_failures = 0
+        while not self._stopping:
+            exit_code, cycles = self.run_worker()
+            if self._stopping:
+                break
+            if exit_code == 0:
+                early_failures = 0
+                continue
+            # Процесс, упавший до первого такта, скорее всего упадет и при перезапуске - пауза растет
+            early_failures = early_failures + 1 if cycles == 0 else 0
+            delay = min(self.restart_delay * 2 ** max(early_failures - 1, 0), self.max_restart_delay)
+            if early_failures:
+                logger.error("Рабочий процесс завершился до первого такта", extra={"tags": {
+                    "exit_code": exit_code,
+                    "early_failures": early_failures,
+                    "restart_delay": delay
+                }})
+            self._sleep(delay)
+        logger.info("Супервизор остановлен")
@@ -0,0 +1,47 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+from benchmarks.loadtest.fakes import InMemoryRedis
+from src import service
+from src.feature.MediaPolicy import MediaBudget
+from src.redis.RedisManager import RedisQueue
+
+
+class DeferredMediaTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = RedisQueue("deferred_media", connection=InMemoryRedis())
+        self.record = {
+            "channel": "moscowmap",
+            "id_post": 101,
+            "post_url": "https://t.me/s/moscowmap/101",
+            "url": "https://cdn.example/video.mp4",
+            "type": "vid",
+            "size": 1024,
+        }
+
+    def test_receive_without_blocking_returns_record(self):
+        self.queue.send_many_to_queue([self.record])
+        self.assertEqual(self.queue.receive_from_queue(block=False), self.record)
+        self.assertIsNone(self.queue.receive_from_queue(block=False))
+
+    def test_drain_uploads_deferred_video(self):
+        self.queue.send_many_to_queue([self.record])
+        scraper = mock.Mock()
+        scraper.return_value.save_media.return_value = "video.mp4"
+        upload = mock.AsyncMock(return_value={"status": "ok"})
+        with mock.patch.object(service, "deferred_media", self.queue, create=True), \
+                mock.patch.object(service, "media_budget", MediaBudget(10 * 1024 * 1024), create=True), \
+                mock.patch.object(service, "api", SimpleNamespace(available=True), create=True), \
+                mock.patch.object(main, "TeleScraperDict", scraper), \
+                mock.patch.object(main, "upload_media_files", upload):
+            main.drain_deferred_media()
+
+        scraper.assert_called_once_with(self.record["post_url"])
+        upload.assert_awaited_once_with(id_post=101, channel="moscowmap", images=[], videos=["video.mp4"])
+        self.assertEqual(self.queue.depth(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
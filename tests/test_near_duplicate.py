@@ -0,0 +1,93 @@
+import unittest
+
+from src.feature.NearDuplicate import NearDuplicateIndex, hamming_distance, normalize, simhash, tokenize
+
+POSTS = [
+    "В Москве на Ленинском проспекте столкнулись три автомобиля, пострадали два человека. По данным ГИБДД, "
+    "водитель внедорожника не справился с управлением и выехал на встречную полосу. На месте работают экстренные "
+    "службы, движение в сторону центра затруднено, пробка растянулась на 4 километра.",
+    "Аэропорт Шереметьево ввел временные ограничения на прием и выпуск воздушных судов. Из-за сильного снегопада "
+    "задержаны 27 рейсов, еще 12 отменены. Пассажиров просят уточнять информацию о вылете на сайте аэропорта "
+    "и у авиакомпаний.",
+    "Центробанк сохранил ключевую ставку на уровне 16 процентов годовых. Регулятор отметил, что инфляционное "
+    "давление остается высоким, а рост кредитования продолжается. Следующее заседание совета директоров "
+    "по ставке запланировано на 14 февраля.",
+    "В Подмосковье задержали группу мошенников, которые под видом сотрудников банка похищали деньги у пенсионеров. "
+    "По данным полиции, ущерб превысил 40 миллионов рублей. Возбуждено уголовное дело, фигурантам грозит "
+    "до 10 лет лишения свободы.",
+]
+
+# Другие новости о тех же событиях - дубликатами не считаются
+SAME_TOPIC = [
+    "На МКАД в районе Ленинского проспекта произошло ДТП с участием грузовика, пострадавших нет. Движение "
+    "в сторону Каширского шоссе затруднено, водителей просят выбирать пути объезда.",
+    "Аэропорт Внуково работает в штатном режиме несмотря на снегопад. Задержано лишь несколько рейсов, службы "
+    "аэропорта круглосуточно очищают взлетно-посадочные полосы.",
+    "Аналитики ожидают, что Центробанк начнет снижать ключевую ставку не раньше лета. По их мнению, инфляция "
+    "замедлится только во втором квартале.",
+]
+
+
+def cross_posts(text: str) -> dict[str, str]:
+    """
+    Варианты, в которых новость перепечатывают другие каналы.
+    """
+    number = next(token for token in tokenize(text) if token.isdigit())
+    return {
+        "mention_footer": f"{text}\n\n@moscowmap",
+        "subscribe_footer": f"{text}\n\nПодписывайтесь на Москву с огоньком 🔥 @moscowmap",
+        "link_footer": f"{text}\n\nhttps://t.me/moscowmap",
+        "hashtags": f"{text}\n\n#москва #новости #происшествия",
+        "urgent_prefix": f"⚡️ Срочно: {text}",
+        "changed_number": text.replace(number, str(int(number) + 3), 1),
+        "combined": f"❗️{text.replace(number, str(int(number) + 1), 1)}\n\n@moscow_live | #новости",
+    }
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_strips_footer_links_and_tags(self):
+        text = ("На Тверской улице #москва завтра перекроют движение https://example.com/news\n\n"
+                "Подписывайтесь на канал @moscowmap")
+        self.assertEqual(tokenize(text), ["тверской", "улице", "завтра", "перекроют", "движение"])
+
+    def test_keeps_long_lines_with_mentions(self):
+        text = "Как сообщил @mos_official, на Тверской улице с завтрашнего дня перекроют движение до конца недели"
+        self.assertIn("тверской", normalize(text).lower())
+        self.assertNotIn("mos_official", normalize(text))
+
+
+class SimhashTest(unittest.TestCase):
+    max_distance = NearDuplicateIndex().max_distance
+
+    def test_cross_posts_are_close(self):
+        for text in POSTS:
+            fingerprint = simhash(tokenize(text))
+            for name, variant in cross_posts(text).items():
+                with self.subTest(post=text[:30], variant=name):
+                    self.assertLessEqual(hamming_distance(fingerprint, simhash(tokenize(variant))), self.max_distance)
+
+    def test_different_news_are_far(self):
+        texts = POSTS + SAME_TOPIC
+        for i, a in enumerate(texts):
+            for b in texts[i + 1:]:
+                with self.subTest(a=a[:30], b=b[:30]):
+                    distance = hamming_distance(simhash(tokenize(a)), simhash(tokenize(b)))
+                    self.assertGreater(distance, 2 * self.max_distance)
+
+
+class NearDuplicateIndexTest(unittest.TestCase):
+    def test_cross_post_points_to_original(self):
+        index = NearDuplicateIndex()
+        self.assertIsNone(index.check_and_add("moscowmap", 1, POSTS[0]))
+        self.assertIsNone(index.check_and_add("moscow_live", 7, SAME_TOPIC[0]))
+        variant = cross_posts(POSTS[0])["combined"]
+        self.assertEqual(index.check_and_add("moscow_live", 8, variant), {"channel": "moscowmap", "id_post": 1})
+
+    def test_short_text_is_not_indexed(self):
+        index = NearDuplicateIndex()
+        self.assertIsNone(index.check_and_add("moscowmap", 1, "Срочно! Подробности позже @moscowmap"))
+        self.assertIsNone(index.check_and_add("moscow_live", 2, "Срочно! Подробности позже @moscowmap"))
+
+
+if __name__ == "__main__":
+    unittest.main()
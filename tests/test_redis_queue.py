@@ -0,0 +1,60 @@
+import unittest
+
+from benchmarks.loadtest.fakes import InMemoryRedis
+from src.redis.QueueCodec import HEADER_MARK, QueueCodec
+from src.redis.RedisManager import RedisQueue
+
+ITEM = {
+    "channel": "moscowmap",
+    "id_post": "101",
+    "text": "Движение по Тверской улице перекроют до конца недели. " * 40,
+    "images": ["a.jpg", "b.jpg"],
+    "duplicate_of": None,
+}
+
+CODECS = {
+    "json-plain": QueueCodec(),
+    "msgpack+zlib": QueueCodec("msgpack", "zlib", compress_threshold=64),
+    "json+zstd": QueueCodec("json", "zstd", compress_threshold=64),
+}
+
+
+class QueueCodecRoundTripTest(unittest.TestCase):
+    def make_queue(self, codec: QueueCodec) -> RedisQueue:
+        return RedisQueue("filter", connection=InMemoryRedis(), codec=codec)
+
+    def test_blocking_receive(self):
+        for name, codec in CODECS.items():
+            with self.subTest(codec=name):
+                queue = self.make_queue(codec)
+                queue.send_to_queue(ITEM)
+                self.assertEqual(queue.receive_from_queue(block=True, timeout=1), ITEM)
+
+    def test_non_blocking_receive(self):
+        for name, codec in CODECS.items():
+            with self.subTest(codec=name):
+                queue = self.make_queue(codec)
+                queue.send_many_to_queue([ITEM, {"id_post": "102"}])
+                self.assertEqual(queue.receive_from_queue(block=False), ITEM)
+                self.assertEqual(queue.receive_from_queue(block=False), {"id_post": "102"})
+                self.assertIsNone(queue.receive_from_queue(block=False))
+
+    def test_headered_items_are_compressed(self):
+        for name in ("msgpack+zlib", "json+zstd"):
+            with self.subTest(codec=name):
+                encoded = CODECS[name].encode(ITEM)
+                self.assertTrue(encoded[0] & HEADER_MARK)
+                self.assertLess(len(encoded), len(CODECS["json-plain"].encode(ITEM)))
+
+    def test_plain_reader_accepts_headered_items(self):
+        # Потребитель с форматом по умолчанию читает элементы, записанные любым кодеком
+        for name, codec in CODECS.items():
+            with self.subTest(codec=name):
+                queue = self.make_queue(codec)
+                queue.send_to_queue(ITEM)
+                reader = RedisQueue("filter", connection=queue.redis_conn)
+                self.assertEqual(reader.receive_from_queue(block=False), ITEM)
+
+
+if __name__ == "__main__":
+    unittest.main()